@@ -0,0 +1,48 @@
+"""
+Authentication of protected resource requests for Django REST framework::
+
+    REST_FRAMEWORK = {
+        'DEFAULT_AUTHENTICATION_CLASSES': (
+            'oauth_provider.authentication.OAuthAuthentication',
+        ),
+    }
+
+Requests go through the same parsing, store and verification stages as
+`oauth_required` views, once per request.
+"""
+import oauth2 as oauth
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+from oauth_provider.decorators import verify_access_request, get_access_token_user
+from oauth_provider.utils import get_oauth_request, OAUTH_REALM_KEY_NAME
+
+
+class OAuthAuthentication(BaseAuthentication):
+    """
+    Authenticates requests signed with an access token as
+    `(token.user, token)`, the user being loaded only if used, or an
+    `AnonymousUser` for tokens without one. Requests without an access token
+    are left to the other authentication classes.
+    """
+    def authenticate(self, request):
+        django_request = request._request
+        oauth_request = get_oauth_request(django_request)
+        if oauth_request is None or 'oauth_token' not in oauth_request:
+            return None
+
+        error_response = verify_access_request(django_request)
+        if error_response is not None:
+            if error_response.status_code == 429:
+                raise exceptions.Throttled(int(error_response['Retry-After']))
+            raise exceptions.AuthenticationFailed(error_response.content)
+
+        user = get_access_token_user(django_request)
+        if user is None:
+            user = AnonymousUser()
+        return user, django_request.oauth.token
+
+    def authenticate_header(self, request):
+        return oauth.build_authenticate_header(realm=OAUTH_REALM_KEY_NAME)['WWW-Authenticate']
@@ -0,0 +1,213 @@
+"""
+Cache helpers shared by the cache-backed store and the model signal handlers
+that keep it coherent.
+"""
+import hashlib
+import math
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.utils.encoding import smart_str
+
+from oauth_provider.compat import get_cache, OrderedDict
+
+CACHE_ALIAS = getattr(settings, 'OAUTH_CACHE_ALIAS', 'default')
+CACHE_PREFIX = getattr(settings, 'OAUTH_CACHE_PREFIX', 'oauth_provider')
+CACHE_TIMEOUT = getattr(settings, 'OAUTH_CACHE_TIMEOUT', 300)
+CACHE_NEGATIVE_TIMEOUT = getattr(settings, 'OAUTH_CACHE_NEGATIVE_TIMEOUT', 30)
+UNKNOWN_KEYS_CACHE_SIZE = getattr(settings, 'OAUTH_UNKNOWN_KEYS_CACHE_SIZE', 10000)
+UNKNOWN_KEYS_CACHE_TIMEOUT = getattr(settings, 'OAUTH_UNKNOWN_KEYS_CACHE_TIMEOUT', 5)
+CONSUMER_BLOOM_FILTER = getattr(settings, 'OAUTH_CONSUMER_BLOOM_FILTER', False)
+CONSUMER_BLOOM_FILTER_REFRESH = getattr(settings, 'OAUTH_CONSUMER_BLOOM_FILTER_REFRESH', 300)
+
+# Cached in place of an object to remember that its key does not exist.
+MISSING = 'oauth_provider:missing'
+
+
+class LRUCache(object):
+    """
+    Small thread-safe in-process cache keeping the `size` most recently used
+    entries.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.size:
+                del self._data[next(iter(self._data))]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class NegativeCache(object):
+    """
+    In-process set of the `size` most recently seen keys that do not exist,
+    each remembered for `timeout` seconds.
+    """
+    def __init__(self, size, timeout):
+        self.timeout = timeout
+        self._expires = LRUCache(size)
+
+    def __contains__(self, key):
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires < time.time():
+            self._expires.delete(key)
+            return False
+        return True
+
+    def add(self, key):
+        if self.timeout:
+            self._expires.set(key, time.time() + self.timeout)
+
+    def discard(self, key):
+        self._expires.delete(key)
+
+    def clear(self):
+        self._expires.clear()
+
+
+class BloomFilter(object):
+    """
+    Set of strings answering membership with no false negatives and about
+    `error_rate` false positives while it holds at most `capacity` of them.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.bits / float(capacity) * math.log(2))))
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key):
+        h1, h2 = struct.unpack('<QQ', hashlib.md5(smart_str(key)).digest())
+        return [(h1 + i * h2) % self.bits for i in xrange(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        array = self._array
+        for position in self._positions(key):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class ConsumerKeyFilter(object):
+    """
+    Bloom filter of every `Consumer.key`, loaded from the database on first
+    use and reloaded every `refresh` seconds. Keys saved in this process are
+    added at once, those saved by other processes show up after the reload.
+    """
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self._filter = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        from oauth_provider.models import Consumer
+        with self._lock:
+            keys = list(Consumer.objects.values_list('key', flat=True))
+            # room for the consumers created until the next reload
+            bloom = BloomFilter(max(2 * len(keys), 1024))
+            for key in keys:
+                bloom.add(key)
+            self._filter, self._loaded = bloom, time.time()
+
+    def add(self, key):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(key)
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+
+    def __contains__(self, key):
+        if self._filter is None or time.time() - self._loaded > self.refresh:
+            self.load()
+        return key in self._filter
+
+
+# Keys looked up in vain by this process. Scanners send random keys, which
+# are then refused without a query for `OAUTH_UNKNOWN_KEYS_CACHE_TIMEOUT`.
+unknown_consumers = NegativeCache(UNKNOWN_KEYS_CACHE_SIZE, UNKNOWN_KEYS_CACHE_TIMEOUT)
+unknown_access_tokens = NegativeCache(UNKNOWN_KEYS_CACHE_SIZE, UNKNOWN_KEYS_CACHE_TIMEOUT)
+consumer_key_filter = ConsumerKeyFilter(CONSUMER_BLOOM_FILTER_REFRESH) if CONSUMER_BLOOM_FILTER else None
+
+
+def is_unknown_consumer(consumer_key):
+    """Whether `consumer_key` is known not to exist, without a query."""
+    return consumer_key in unknown_consumers or \
+        (consumer_key_filter is not None and consumer_key not in consumer_key_filter)
+
+
+def get_oauth_cache():
+    return get_cache(CACHE_ALIAS)
+
+
+def make_key(kind, key):
+    """
+    Build a cache key for `key`. OAuth keys come straight from the client, so
+    they are hashed to keep the result safe for memcached-style backends.
+    """
+    return '%s:%s:%s' % (CACHE_PREFIX, kind, hashlib.md5(smart_str(key)).hexdigest())
+
+
+def consumer_cache_key(consumer_key):
+    return make_key('consumer', consumer_key)
+
+
+def consumer_rate_limit_cache_key(consumer_key):
+    return make_key('consumer_rate_limit', consumer_key)
+
+
+def access_token_cache_key(access_token_key):
+    # the bit of a deleted scope may be given to a new one, so cached scopes
+    # only hold for the scopes they were cached with
+    from oauth_provider.scopes import registry as scopes
+    return make_key('access_token', '%s\n%s' % (scopes.version, access_token_key))
+
+
+def invalidate_consumer(sender, instance, **kwargs):
+    """`post_save`/`post_delete` handler for `Consumer`."""
+    if instance.key:
+        get_oauth_cache().delete_many([consumer_cache_key(instance.key),
+                                       consumer_rate_limit_cache_key(instance.key)])
+        unknown_consumers.discard(instance.key)
+        if consumer_key_filter is not None:
+            consumer_key_filter.add(instance.key)
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """`post_save`/`post_delete` handler for `Token`."""
+    if instance.key and instance.token_type == instance.ACCESS:
+        get_oauth_cache().delete(access_token_cache_key(instance.key))
+        unknown_access_tokens.discard(instance.key)
@@ -57,3 +57,51 @@ if django.VERSION >= (1, 4):
             self["Location"] = url
 else:
     from django.http import HttpResponseRedirect as UnsafeRedirect
+
+
+if django.VERSION >= (1, 7):
+    from django.core.cache import caches
+    get_cache = lambda alias: caches[alias]
+else:
+    from django.core.cache import get_cache
+
+
+if django.VERSION >= (1, 6):
+    from django.db.transaction import atomic
+else:
+    from contextlib import contextmanager
+    from django.db import transaction
+
+    @contextmanager
+    def atomic():
+        # savepoint based fallback so a failed statement does not break the
+        # surrounding transaction
+        sid = transaction.savepoint()
+        try:
+            yield
+        except:
+            transaction.savepoint_rollback(sid)
+            raise
+        else:
+            transaction.savepoint_commit(sid)
+
+
+if django.VERSION >= (1, 9):
+    from django.db.transaction import on_commit
+else:
+    # no transaction hooks, the function runs at once
+    on_commit = lambda func: func()
+
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:
+    # Django < 1.10 only knows MIDDLEWARE_CLASSES
+    MiddlewareMixin = object
+
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    # Python 2.6
+    from django.utils.datastructures import SortedDict as OrderedDict
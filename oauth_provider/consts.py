@@ -6,6 +6,8 @@ SECRET_SIZE = getattr(settings, 'OAUTH_PROVIDER_SECRET_SIZE', 16)
 VERIFIER_SIZE = getattr(settings, 'OAUTH_PROVIDER_VERIFIER_SIZE', 10)
 CONSUMER_KEY_SIZE = getattr(settings, 'OAUTH_PROVIDER_CONSUMER_KEY_SIZE', 256)
 MAX_URL_LENGTH = 2083 # http://www.boutell.com/newfaq/misc/urllength.html
+# the scopes of a token are a bitmask in a signed 64 bit integer
+MAX_SCOPES = 63
 
 PENDING = 1
 ACCEPTED = 2
@@ -22,5 +24,7 @@ CONSUMER_STATES = (
 PARAMETERS_NAMES = ('consumer_key', 'token', 'signature',
                     'signature_method', 'timestamp', 'nonce')
 OAUTH_PARAMETERS_NAMES = ['oauth_'+s for s in PARAMETERS_NAMES]
+REQUIRED_PARAMETERS = ('oauth_consumer_key', 'oauth_nonce', 'oauth_signature',
+                       'oauth_signature_method', 'oauth_timestamp')
 
 OUT_OF_BAND = 'oob'
@@ -5,15 +5,77 @@ try:
 except ImportError:
     from django.utils.functional import update_wrapper  # Python 2.3, 2.4 fallback.
 
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import ugettext as _
 
 from responses import INVALID_PARAMS_RESPONSE, INVALID_CONSUMER_RESPONSE, COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE, INVALID_SCOPE_RESPONSE
-from utils import initialize_server_request, send_oauth_error, get_oauth_request, verify_oauth_request
+from utils import initialize_server_request, send_oauth_error, get_oauth_request, verify_resolved_request,\
+    precheck_oauth_request
 from consts import OAUTH_PARAMETERS_NAMES
 from store import store, InvalidTokenError, InvalidConsumerError
+from scopes import registry as scopes
+from signals import timed
+from ratelimit import check_rate_limits
 from functools import wraps
 
 
+def verify_access_request(request):
+    """
+    Verify `request` as a protected resource request. Verification runs once
+    per request and its outcome is kept in `request.oauth`, so stacked
+    decorators and the middleware share it. Return `None` if the request is
+    verified, or else the response to reject it with.
+    """
+    oauth_request = get_oauth_request(request)
+    if oauth_request is None or 'oauth_token' not in oauth_request:
+        return INVALID_PARAMS_RESPONSE
+
+    state = request.oauth
+    # a nonce can't be used twice, so neither can a verification be repeated
+    if not state.verified and state.error_response is None:
+        state.error_response = _verify_access_request(request, oauth_request)
+    return state.error_response
+
+
+def _verify_access_request(request, oauth_request):
+    rate_limited = check_rate_limits(request, oauth_request)
+    if rate_limited is not None:
+        return rate_limited
+
+    if not precheck_oauth_request(request, oauth_request):
+        return COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
+
+    with timed(request, 'resolve') as timer:
+        try:
+            consumer, token = store.get_consumer_and_access_token(request, oauth_request,
+                                                                  oauth_request['oauth_consumer_key'],
+                                                                  oauth_request.get_parameter('oauth_token'))
+        except InvalidConsumerError:
+            timer.fail('invalid_consumer')
+            return INVALID_CONSUMER_RESPONSE
+        except InvalidTokenError:
+            timer.fail('invalid_token')
+            return send_oauth_error(oauth.Error(_('Invalid access token: %s') % oauth_request.get_parameter('oauth_token')))
+    request.oauth.consumer = consumer
+
+    if not verify_resolved_request(request, oauth_request, consumer, token):
+        return COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
+
+    request.oauth.set_verified(consumer, token)
+    return None
+
+
+def get_access_token_user(request):
+    """
+    Return the user of the access token of a verified `request` as a lazy
+    object, so it is only loaded if used, or `None` if the token has none.
+    """
+    state = request.oauth
+    if state.token.user_id is None:
+        return None
+    return SimpleLazyObject(lambda: store.get_user_for_access_token(request, state.oauth_request, state.token))
+
+
 class CheckOauth(object):
     """
     Decorator that checks that the OAuth parameters passes the given test, raising
@@ -24,10 +86,14 @@ class CheckOauth(object):
     CheckOAuth object is used as a method decorator, the view function
     is properly bound to its instance.
     """
-    def __init__(self, scope_name=None):
+    def __init__(self, scope_name=None, any_of=(), all_of=()):
         self.scope_name = scope_name
+        self.any_of = tuple(any_of)
+        self.all_of = tuple(all_of)
+        if scope_name:
+            self.all_of += (scope_name,)
 
-    def __new__(cls, arg=None):
+    def __new__(cls, arg=None, **kwargs):
         if not callable(arg):
             return super(CheckOauth, cls).__new__(cls)
         else:
@@ -39,32 +105,30 @@ class CheckOauth(object):
 
         @wraps(view_func)
         def wrapped_view(request, *args, **kwargs):
-            oauth_request = get_oauth_request(request)
-            if oauth_request is None:
-                return INVALID_PARAMS_RESPONSE
-
-            try:
-                consumer = store.get_consumer(request, oauth_request, oauth_request['oauth_consumer_key'])
-            except InvalidConsumerError:
-                return INVALID_CONSUMER_RESPONSE
-
-            try:
-                token = store.get_access_token(request, oauth_request, consumer, oauth_request.get_parameter('oauth_token'))
-            except InvalidTokenError:
-                return send_oauth_error(oauth.Error(_('Invalid access token: %s') % oauth_request.get_parameter('oauth_token')))
+            error_response = verify_access_request(request)
+            if error_response is not None:
+                return error_response
+            token = request.oauth.token
 
-            if not verify_oauth_request(request, oauth_request, consumer, token):
-                return COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
-
-            if self.scope_name and (not token.scope
-                                    or token.scope.name != self.scope_name):
+            if not self.has_scopes(token):
                 return INVALID_SCOPE_RESPONSE
 
-            if token.user:
-                request.user = token.user
+            user = get_access_token_user(request)
+            if user is not None:
+                request.user = user
             return view_func(request, *args, **kwargs)
 
         return wrapped_view
 
+    def has_scopes(self, token):
+        """
+        Whether `token` has every scope of `all_of` and one of `any_of`, or
+        an ancestor of them, compared as bitmasks.
+        """
+        for name in self.all_of:
+            if not token.scopes & scopes.mask(name):
+                return False
+        return not self.any_of or bool(token.scopes & scopes.mask(*self.any_of))
+
 
 oauth_required = CheckOauth
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from oauth_provider.models import Consumer, Token
+
+
+class Command(BaseCommand):
+    help = ("Report duplicate Consumer and Token keys. Run it before applying the "
+            "migration that makes those keys unique; it only reads the tables.")
+
+    def handle(self, *args, **options):
+        found = False
+        for model in (Consumer, Token):
+            duplicates = model.objects.exclude(key=None).values('key')\
+                .annotate(count=Count('id')).filter(count__gt=1).order_by()
+            for duplicate in duplicates:
+                found = True
+                self.stdout.write('%s key %r is used %d times.\n' % (
+                    model.__name__, duplicate['key'], duplicate['count']))
+
+        if found:
+            raise CommandError('Duplicate keys found, resolve them before migrating.')
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('No duplicate keys found.\n')
@@ -0,0 +1,41 @@
+from optparse import make_option
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from oauth_provider.models import Nonce
+from oauth_provider.store.nonce import NONCE_VALID_PERIOD, current_timestamp
+
+
+class Command(BaseCommand):
+    help = ("Delete nonces older than OAUTH_NONCE_VALID_PERIOD in small chunks. "
+            "Meant to be run periodically, e.g. from cron.")
+
+    if django.VERSION < (1, 8):
+        option_list = BaseCommand.option_list + (
+            make_option('--max-age', type='int', dest='max_age', default=None,
+                        help='Age in seconds above which nonces are deleted. Defaults to OAUTH_NONCE_VALID_PERIOD.'),
+            make_option('--chunk-size', type='int', dest='chunk_size', default=1000,
+                        help='Number of rows deleted per statement.'),
+            make_option('--pause', type='float', dest='pause', default=0,
+                        help='Seconds to sleep between chunks.'),
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, dest='max_age', default=None,
+                            help='Age in seconds above which nonces are deleted. Defaults to OAUTH_NONCE_VALID_PERIOD.')
+        parser.add_argument('--chunk-size', type=int, dest='chunk_size', default=1000,
+                            help='Number of rows deleted per statement.')
+        parser.add_argument('--pause', type=float, dest='pause', default=0,
+                            help='Seconds to sleep between chunks.')
+
+    def handle(self, *args, **options):
+        max_age = options.get('max_age') or NONCE_VALID_PERIOD
+        if not max_age:
+            raise CommandError('Set OAUTH_NONCE_VALID_PERIOD or pass --max-age.')
+
+        deleted = Nonce.objects.delete_expired(current_timestamp() - max_age,
+                                               chunk_size=options.get('chunk_size') or 1000,
+                                               pause=options.get('pause') or 0)
+        if int(options.get('verbosity', 1)) > 0:
+            self.stdout.write('Deleted %d nonces.\n' % deleted)
@@ -1,17 +1,41 @@
+import time
+
 from django.db import models
 
 
 class TokenManager(models.Manager):
     def create_token(self, consumer, token_type, timestamp, scope,
-            user=None, callback=None, callback_confirmed=False):
+            user=None, callback=None, callback_confirmed=False, scopes=0):
         """Shortcut to create a token with random key/secret."""
         token, created = self.get_or_create(consumer=consumer, 
                                             token_type=token_type, 
                                             timestamp=timestamp,
                                             scope=scope,
+                                            scopes=scopes,
                                             user=user,
                                             callback=callback,
                                             callback_confirmed=callback_confirmed)
         if created:
             token.generate_random_codes()
         return token
+
+
+class NonceManager(models.Manager):
+    def delete_expired(self, before, chunk_size=1000, pause=0):
+        """
+        Delete nonces with a timestamp older than `before`, at most
+        `chunk_size` rows at a time along the timestamp index, sleeping
+        `pause` seconds between chunks so no long lock is held. Returns the
+        number of deleted nonces.
+        """
+        deleted = 0
+        while True:
+            ids = list(self.filter(timestamp__lt=before).order_by('timestamp')
+                           .values_list('id', flat=True)[:chunk_size])
+            if ids:
+                self.filter(id__in=ids).delete()
+                deleted += len(ids)
+            if len(ids) < chunk_size:
+                return deleted
+            if pause:
+                time.sleep(pause)
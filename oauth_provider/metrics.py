@@ -0,0 +1,157 @@
+"""
+In-process metrics of OAuth request handling.
+
+With `OAUTH_METRICS_ENABLED = True` every `signals.stage_timed` event is
+recorded in the process-wide `registry`:
+
+- `oauth_stage_outcomes_total{stage, outcome, endpoint, consumer}` counts
+  stages by outcome, e.g. `stage="check_nonce", outcome="nonce"` for replayed
+  nonces or `stage="resolve", outcome="invalid_consumer"`;
+- `oauth_stage_duration_seconds{stage, endpoint}` is a latency histogram.
+
+`metrics_view` renders the registry in the Prometheus text exposition
+format; `oauth_provider.metrics_urls` mounts it. Each process keeps its own
+registry.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+METRICS_ENABLED = getattr(settings, 'OAUTH_METRICS_ENABLED', False)
+METRICS_BUCKETS = getattr(settings, 'OAUTH_METRICS_BUCKETS',
+                          (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+METRICS_MAX_CONSUMERS = getattr(settings, 'OAUTH_METRICS_MAX_CONSUMERS', 1000)
+METRICS_ALLOWED_IPS = getattr(settings, 'OAUTH_METRICS_ALLOWED_IPS', getattr(settings, 'INTERNAL_IPS', ()))
+
+# label of the consumers beyond `max_consumers`
+OTHER_CONSUMERS = 'other'
+# label of the requests whose consumer has not been resolved
+UNKNOWN_CONSUMER = 'unknown'
+
+
+def _escape(value):
+    return unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in labels)
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe counters and histograms identified by a name and a tuple of
+    `(label, value)` pairs. At most `max_consumers` distinct consumer labels
+    are kept, the others are counted as `OTHER_CONSUMERS`.
+    """
+    def __init__(self, buckets=METRICS_BUCKETS, max_consumers=METRICS_MAX_CONSUMERS):
+        self.buckets = tuple(sorted(buckets))
+        self.max_consumers = max_consumers
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._counters = {}
+            # per series: [count of each bucket..., count above the last, sum]
+            self._histograms = {}
+            self._consumers = set()
+
+    def consumer_label(self, key):
+        if not key or key in self._consumers:
+            return key or ''
+        with self._lock:
+            if len(self._consumers) >= self.max_consumers:
+                return OTHER_CONSUMERS
+            self._consumers.add(key)
+        return key
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def get(self, name, labels=()):
+        """Return the value of a counter."""
+        return self._counters.get((name, labels), 0)
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        """Return the registry in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(series)) for key, series in self._histograms.items())
+
+        lines = []
+        last_name = None
+        for (name, labels), value in counters:
+            if name != last_name:
+                lines.append('# TYPE %s counter' % name)
+                last_name = name
+            lines.append('%s%s %s' % (name, _format_labels(labels), _format_number(value)))
+        for (name, labels), series in histograms:
+            if name != last_name:
+                lines.append('# TYPE %s histogram' % name)
+                last_name = name
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                bucket_labels = labels + (('le', bound if bound == '+Inf' else _format_number(float(bound))),)
+                lines.append('%s_bucket%s %d' % (name, _format_labels(bucket_labels), cumulative))
+            lines.append('%s_sum%s %s' % (name, _format_labels(labels), _format_number(float(series[-1]))))
+            lines.append('%s_count%s %d' % (name, _format_labels(labels), cumulative))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return getattr(match, 'view_name', None) or getattr(match, 'url_name', None) or 'unknown'
+
+
+def _consumer_key(request):
+    from oauth_provider.utils import OAuthState
+    state = getattr(request, 'oauth', None)
+    # a lazy state set by OAuthAuthenticationMiddleware is not evaluated:
+    # the request is being verified and may not have been parsed yet
+    if type(state) is not OAuthState or state.consumer is None:
+        return None
+    return state.consumer.key
+
+
+def record_stage(sender, request, stage, duration, outcome, **kwargs):
+    """Receiver of `signals.stage_timed` feeding `registry`."""
+    endpoint = _endpoint(request)
+    key = _consumer_key(request)
+    # the key sent by the client could be anything, only resolved ones count
+    consumer = UNKNOWN_CONSUMER if key is None else registry.consumer_label(key)
+    registry.inc('oauth_stage_outcomes_total',
+                 (('consumer', consumer), ('endpoint', endpoint), ('outcome', outcome), ('stage', stage)))
+    registry.observe('oauth_stage_duration_seconds', (('endpoint', endpoint), ('stage', stage)), duration)
+
+
+def metrics_view(request):
+    """
+    Render `registry` as `text/plain`, to clients whose address is in
+    `OAUTH_METRICS_ALLOWED_IPS` (by default `INTERNAL_IPS`).
+    """
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
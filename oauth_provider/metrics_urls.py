@@ -0,0 +1,7 @@
+from oauth_provider.compat import url
+
+from metrics import metrics_view
+
+urlpatterns = [
+    url(r'^metrics/$',          metrics_view,       name='oauth_metrics'),
+]
@@ -0,0 +1,68 @@
+"""
+Authentication of protected resource requests for a whole site, instead of
+decorating each view with `oauth_required`.
+
+`OAuthAuthenticationMiddleware` replaces `request.oauth` and `request.user`
+with lazy objects: the request is verified the first time either of them is
+used, once, and endpoints that never look at them pay nothing. Paths
+starting with one of `OAUTH_PROTECTED_PREFIXES` are verified before their
+view is called and rejected like `oauth_required` views.
+
+With `OAUTH_ENFORCE_SCOPE_URLS`, paths below the `url` of a scope are
+verified as well, and their token must have one of the scopes of the
+longest matching url.
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+
+from oauth_provider.compat import MiddlewareMixin
+from oauth_provider.decorators import verify_access_request, get_access_token_user
+from oauth_provider.responses import INVALID_SCOPE_RESPONSE
+from oauth_provider.scopes import registry as scopes
+
+PROTECTED_PREFIXES = tuple(getattr(settings, 'OAUTH_PROTECTED_PREFIXES', ()))
+ENFORCE_SCOPE_URLS = getattr(settings, 'OAUTH_ENFORCE_SCOPE_URLS', False)
+
+
+def get_oauth_state(request):
+    verify_access_request(request)
+    return request.oauth
+
+
+def get_user(request, fallback):
+    """
+    The user of the access token of a verified request, otherwise the user
+    set by the middleware before this one.
+    """
+    state = get_oauth_state(request)
+    if state.verified and state.token.user_id is not None:
+        return get_access_token_user(request)
+    if fallback is None:
+        return AnonymousUser()
+    return fallback
+
+
+class OAuthAuthenticationMiddleware(MiddlewareMixin):
+    """
+    Put it after `django.contrib.auth.middleware.AuthenticationMiddleware`,
+    whose user is kept for requests without valid OAuth credentials.
+    """
+    def process_request(self, request):
+        user = getattr(request, 'user', None)
+        request.oauth = SimpleLazyObject(lambda: get_oauth_state(request))
+        request.user = SimpleLazyObject(lambda: get_user(request, user))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if ENFORCE_SCOPE_URLS:
+            required = scopes.url_mask(request.path_info)
+            if required:
+                error_response = verify_access_request(request)
+                if error_response is not None:
+                    return error_response
+                if not request.oauth.token.scopes & required:
+                    return INVALID_SCOPE_RESPONSE
+                return None
+        if PROTECTED_PREFIXES and request.path_info.startswith(PROTECTED_PREFIXES):
+            return verify_access_request(request)
+        return None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import models, migrations
+from django.utils.encoding import smart_str
+
+
+def remove_duplicate_nonces(apps, schema_editor):
+    # duplicates can only come from concurrent replays; keep the first row
+    Nonce = apps.get_model('oauth_provider', 'Nonce')
+    duplicates = Nonce.objects.values('consumer_key', 'token_key', 'key', 'timestamp')\
+        .annotate(min_id=models.Min('id'), count=models.Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        min_id = duplicate.pop('min_id')
+        del duplicate['count']
+        Nonce.objects.filter(**duplicate).exclude(id=min_id).delete()
+
+
+def fill_digests(apps, schema_editor):
+    # same as oauth_provider.models.nonce_digest
+    Nonce = apps.get_model('oauth_provider', 'Nonce')
+    nonces = Nonce.objects.values_list('id', 'consumer_key', 'token_key', 'key', 'timestamp')
+    for id, consumer_key, token_key, key, timestamp in nonces.iterator():
+        digest = hashlib.sha1(smart_str('\n'.join((consumer_key, token_key, key, unicode(timestamp))))).hexdigest()
+        Nonce.objects.filter(id=id).update(digest=digest)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+    """
+    Nonces are unique on a digest of their four values: an index on the
+    columns themselves is longer than MySQL allows for utf8 keys.
+    """
+
+    dependencies = [
+        ('oauth_provider', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_nonces, noop),
+        migrations.AddField(
+            model_name='nonce',
+            name='digest',
+            field=models.CharField(max_length=40, null=True, editable=False),
+        ),
+        migrations.RunPython(fill_digests, noop),
+        migrations.AlterField(
+            model_name='nonce',
+            name='digest',
+            field=models.CharField(max_length=40, unique=True, editable=False),
+        ),
+    ]
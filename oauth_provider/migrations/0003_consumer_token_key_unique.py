@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count
+
+
+def check_duplicate_keys(apps, schema_editor):
+    # before any table is altered, as MySQL can't roll back a half applied
+    # migration
+    for name in ('Consumer', 'Token'):
+        model = apps.get_model('oauth_provider', name)
+        if model.objects.exclude(key=None).values('key').annotate(count=Count('id')).filter(count__gt=1).exists():
+            raise ValueError('Duplicate %s keys, list them with manage.py check_oauth_keys.' % name)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+    """
+    Run `manage.py check_oauth_keys` before applying this migration on
+    existing data: it fails on duplicate keys. Adding the unique indexes
+    locks the consumer and token tables while they are built.
+    """
+
+    dependencies = [
+        ('oauth_provider', '0002_nonce_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_keys, noop),
+        migrations.AlterField(
+            model_name='consumer',
+            name='key',
+            field=models.CharField(unique=True, max_length=256),
+        ),
+        migrations.AlterField(
+            model_name='token',
+            name='key',
+            field=models.CharField(max_length=32, unique=True, null=True, blank=True),
+        ),
+    ]
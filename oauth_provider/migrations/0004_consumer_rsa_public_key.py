@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_provider', '0003_consumer_token_key_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumer',
+            name='rsa_public_key',
+            field=models.TextField(verbose_name=b'RSA public key', blank=True),
+        ),
+    ]
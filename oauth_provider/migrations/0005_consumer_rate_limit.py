@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_provider', '0004_consumer_rsa_public_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumer',
+            name='rate_limit',
+            field=models.PositiveIntegerField(null=True, verbose_name=b'Rate limit', blank=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+from oauth_provider.consts import MAX_SCOPES
+
+
+def assign_scope_bits(apps, schema_editor):
+    Scope = apps.get_model('oauth_provider', 'Scope')
+    Token = apps.get_model('oauth_provider', 'Token')
+    scopes = list(Scope.objects.order_by('pk'))
+    if len(scopes) > MAX_SCOPES:
+        raise ValueError('No more than %d scopes are supported, found %d.' % (MAX_SCOPES, len(scopes)))
+    for bit, scope in enumerate(scopes):
+        Scope.objects.filter(pk=scope.pk).update(bit=bit)
+        Token.objects.filter(scope=scope).update(scopes=1 << bit)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_provider', '0005_consumer_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scope',
+            name='bit',
+            field=models.PositiveSmallIntegerField(unique=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='token',
+            name='scopes',
+            field=models.BigIntegerField(default=0, verbose_name=b'Scopes'),
+        ),
+        migrations.RunPython(assign_scope_bits, noop),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oauth_provider', '0006_scope_bits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scope',
+            name='parent',
+            field=models.ForeignKey(related_name='children', on_delete=django.db.models.deletion.SET_NULL, blank=True, to='oauth_provider.Scope', null=True),
+        ),
+    ]
@@ -1,36 +1,91 @@
 import uuid
+import hashlib
 import urllib
 import urlparse
 from time import time
 import warnings
 import oauth2 as oauth
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.db import models
-
-from oauth_provider.compat import AUTH_USER_MODEL, get_random_string
-from oauth_provider.managers import TokenManager
-from oauth_provider.consts import KEY_SIZE, SECRET_SIZE, CONSUMER_KEY_SIZE, CONSUMER_STATES,\
+from django.db.models.signals import post_save, post_delete
+from django.utils.encoding import smart_str
+
+from oauth_provider import metrics
+from oauth_provider.caching import invalidate_consumer, invalidate_token
+from oauth_provider.compat import AUTH_USER_MODEL, get_random_string, atomic
+from oauth_provider.managers import TokenManager, NonceManager
+from oauth_provider.consts import KEY_SIZE, SECRET_SIZE, CONSUMER_KEY_SIZE, CONSUMER_STATES, MAX_SCOPES,\
     PENDING, VERIFIER_SIZE, MAX_URL_LENGTH, OUT_OF_BAND
+from oauth_provider.scopes import registry as scope_registry, invalidate_scopes
+from oauth_provider.signals import stage_timed
+from oauth_provider.signatures import load_rsa_public_key
 from oauth_provider.utils import check_valid_callback
 
 
+def nonce_digest(consumer_key, token_key, key, timestamp):
+    """SHA-1 hex digest identifying a nonce by its four values."""
+    return hashlib.sha1(smart_str(u'\n'.join((consumer_key, token_key, key, unicode(timestamp))))).hexdigest()
+
+
 class Nonce(models.Model):
     token_key = models.CharField(max_length=KEY_SIZE)
     consumer_key = models.CharField(max_length=CONSUMER_KEY_SIZE)
     key = models.CharField(max_length=255)
     timestamp = models.PositiveIntegerField(db_index=True)
-    
+    # makes replayed nonces fail on insert, even under concurrency; the four
+    # columns together are too long for a MySQL utf8 index key
+    digest = models.CharField(max_length=40, unique=True, editable=False)
+
+    objects = NonceManager()
+
     def __unicode__(self):
         return u"Nonce %s for %s" % (self.key, self.consumer_key)
 
+    def save(self, *args, **kwargs):
+        self.digest = nonce_digest(self.consumer_key, self.token_key, self.key, self.timestamp)
+        super(Nonce, self).save(*args, **kwargs)
+
 
 class Scope(models.Model):
     name = models.CharField(max_length=255)
     url = models.TextField(max_length=MAX_URL_LENGTH)
     is_readonly = models.BooleanField(default=True)
+    # position of the scope in `Token.scopes`, assigned on first save
+    bit = models.PositiveSmallIntegerField(null=True, blank=True, unique=True, editable=False)
+    # a token with the parent scope has this one too
+    parent = models.ForeignKey('self', null=True, blank=True, related_name='children',
+                               on_delete=models.SET_NULL)
 
     def __unicode__(self):
         return u"Resource %s with url %s" % (self.name, self.url)
 
+    def clean(self):
+        parent, seen = self.parent, set()
+        while parent is not None and parent.pk not in seen:
+            if self.pk is not None and parent.pk == self.pk:
+                raise ValidationError('A scope can not be its own ancestor.')
+            seen.add(parent.pk)
+            parent = parent.parent
+
+    @property
+    def mask(self):
+        return 1 << self.bit if self.bit is not None else 0
+
+    def save(self, *args, **kwargs):
+        if self.bit is not None:
+            return super(Scope, self).save(*args, **kwargs)
+        used = set(Scope.objects.exclude(bit=None).values_list('bit', flat=True))
+        free = [bit for bit in xrange(MAX_SCOPES) if bit not in used]
+        if not free:
+            raise ValidationError('No more than %d scopes are supported.' % MAX_SCOPES)
+        self.bit = free[0]
+        with atomic():
+            # tokens may still have the bit of a deleted scope; the registry
+            # and the cached tokens only follow once this is committed
+            Token.objects.annotate(held=models.F('scopes').bitand(self.mask)).filter(held__gt=0)\
+                .update(scopes=models.F('scopes').bitand(~self.mask))
+            super(Scope, self).save(*args, **kwargs)
+
 
 class Resource(Scope):
 
@@ -46,16 +101,29 @@ class Consumer(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     
-    key = models.CharField(max_length=CONSUMER_KEY_SIZE)
+    key = models.CharField(max_length=CONSUMER_KEY_SIZE, unique=True)
     secret = models.CharField(max_length=SECRET_SIZE, blank=True)
 
     status = models.SmallIntegerField(choices=CONSUMER_STATES, default=PENDING)
     user = models.ForeignKey(AUTH_USER_MODEL, null=True, blank=True)
     xauth_allowed = models.BooleanField("Allow xAuth", default = False)
+    # PEM public key or X.509 certificate used to check RSA-SHA1 signatures
+    rsa_public_key = models.TextField("RSA public key", blank=True)
+    # requests per OAUTH_RATE_LIMIT_PERIOD, empty for OAUTH_CONSUMER_RATE_LIMIT
+    rate_limit = models.PositiveIntegerField("Rate limit", null=True, blank=True)
         
     def __unicode__(self):
         return u"Consumer %s with key %s" % (self.name, self.key)
 
+    def clean(self):
+        if self.rsa_public_key:
+            try:
+                load_rsa_public_key(self.rsa_public_key)
+            except ImproperlyConfigured, e:
+                raise ValidationError(unicode(e))
+            except ValueError:
+                raise ValidationError('Invalid RSA public key.')
+
     def generate_random_codes(self):
         """
         Used to generate random key/secret pairings.
@@ -75,7 +143,7 @@ class Token(models.Model):
     ACCESS = 2
     TOKEN_TYPES = ((REQUEST, u'Request'), (ACCESS, u'Access'))
     
-    key = models.CharField(max_length=KEY_SIZE, null=True, blank=True)
+    key = models.CharField(max_length=KEY_SIZE, null=True, blank=True, unique=True)
     secret = models.CharField(max_length=SECRET_SIZE, null=True, blank=True)
     token_type = models.SmallIntegerField(choices=TOKEN_TYPES)
     timestamp = models.IntegerField(default=default_token_timestamp)
@@ -84,6 +152,8 @@ class Token(models.Model):
     user = models.ForeignKey(AUTH_USER_MODEL, null=True, blank=True, related_name='tokens')
     consumer = models.ForeignKey(Consumer)
     scope = models.ForeignKey(Scope, null=True, blank=True)
+    # `Scope.mask` of every scope of the token, including `scope`
+    scopes = models.BigIntegerField("Scopes", default=0)
 
     @property
     def resource(self):
@@ -103,6 +173,15 @@ class Token(models.Model):
     def __unicode__(self):
         return u"%s Token %s for %s" % (self.get_token_type_display(), self.key, self.consumer)
 
+    def save(self, *args, **kwargs):
+        if self.scope_id is not None:
+            self.scopes |= (scope_registry.get(self.scope_id) or self.scope).mask
+        super(Token, self).save(*args, **kwargs)
+
+    def get_scopes(self):
+        """The scopes of the token, from the scope registry."""
+        return scope_registry.get_by_mask(self.scopes)
+
     def to_string(self, only_key=False):
         token_dict = {
             'oauth_token': self.key, 
@@ -159,4 +238,17 @@ class Token(models.Model):
                 self.save()
             else:
                 raise oauth.Error('Invalid callback URL.')
-        
+
+
+# Keep cached consumers and tokens coherent with writes made from anywhere
+# (admin, shell, management commands), not only from the OAuth views.
+post_save.connect(invalidate_consumer, sender=Consumer, dispatch_uid='oauth_provider.invalidate_consumer')
+post_delete.connect(invalidate_consumer, sender=Consumer, dispatch_uid='oauth_provider.invalidate_consumer')
+post_save.connect(invalidate_token, sender=Token, dispatch_uid='oauth_provider.invalidate_token')
+post_delete.connect(invalidate_token, sender=Token, dispatch_uid='oauth_provider.invalidate_token')
+for scope_model in (Scope, Resource):
+    post_save.connect(invalidate_scopes, sender=scope_model, dispatch_uid='oauth_provider.invalidate_scopes')
+    post_delete.connect(invalidate_scopes, sender=scope_model, dispatch_uid='oauth_provider.invalidate_scopes')
+
+if metrics.METRICS_ENABLED:
+    stage_timed.connect(metrics.record_stage, dispatch_uid='oauth_provider.metrics.record_stage')
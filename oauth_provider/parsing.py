@@ -0,0 +1,269 @@
+"""
+Lean parsing of OAuth parameters.
+
+`parse_request` collects the parameters of the `Authorization` header, the
+query string and the form body into an `OAuthRequest`, a compact stand-in for
+`oauth2.Request`. Values are kept percent-encoded and only decoded when they
+are read, so a request carrying many parameters costs little when just the
+`oauth_*` ones are looked at.
+
+A parameter given several times reads as its first value, as callers expect
+a single string; all values are kept for the signature base string.
+"""
+import re
+import string
+from urllib import unquote, unquote_plus
+from urlparse import urlsplit, urlunsplit
+
+import oauth2 as oauth
+
+_query_separator = re.compile('[&;]')
+
+# markers of how a raw value is decoded
+HEADER = 0
+QUERY = 1
+
+# RFC 5849 3.6: unreserved characters are kept, every other byte is encoded
+_UNRESERVED = string.ascii_letters + string.digits + '-._~'
+_QUOTED = dict((chr(i), chr(i) if chr(i) in _UNRESERVED else '%%%02X' % i) for i in range(256))
+
+_escaped_keys = {}
+ESCAPED_KEYS_MAX = 1024
+
+
+def _decode(source, raw):
+    if isinstance(raw, list):
+        raw = raw[0]
+    if '%' in raw or (source == QUERY and '+' in raw):
+        raw = unquote(raw) if source == HEADER else unquote_plus(raw)
+    return raw.decode('utf-8', 'replace')
+
+
+def _decode_key(key, source):
+    if '%' in key or (source == QUERY and '+' in key):
+        return unquote(key) if source == HEADER else unquote_plus(key)
+    return key
+
+
+def escape(value):
+    """
+    Percent-encode `value` (utf-8 encoded first if unicode) in a single pass.
+    Same output as `oauth2.escape`.
+    """
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    if not value.translate(None, _UNRESERVED):
+        return value
+    return ''.join(map(_QUOTED.__getitem__, value))
+
+
+def _escape_key(key):
+    # parameter names repeat from request to request, their encodings are
+    # kept in a bounded table
+    try:
+        return _escaped_keys[key]
+    except KeyError:
+        escaped = escape(key)
+        if len(_escaped_keys) < ESCAPED_KEYS_MAX:
+            _escaped_keys[key] = escaped
+        return escaped
+
+
+def normalize_parameters(params):
+    """
+    Return the normalized parameter string of the `params` dict, whose values
+    are strings or lists of strings, leaving `oauth_signature` out.
+    Byte-for-byte the output of `oauth2.Request.get_normalized_parameters`
+    for the same parameters: pairs are ordered by utf-8 encoded name, then
+    value.
+    """
+    values = {}
+    for key, value in params.iteritems():
+        if key != 'oauth_signature':
+            values[key.encode('utf-8') if isinstance(key, unicode) else key] = value
+    parts = []
+    for key in sorted(values):
+        prefix = _escape_key(key) + '='
+        value = values[key]
+        if isinstance(value, basestring):
+            parts.append(prefix + escape(value))
+        elif isinstance(value, (list, tuple)):
+            for item in sorted(item.encode('utf-8') if isinstance(item, unicode) else str(item)
+                               for item in value):
+                parts.append(prefix + escape(item))
+        else:
+            parts.append(prefix + escape(str(value)))
+    return '&'.join(parts)
+
+
+class OAuthRequest(object):
+    """
+    Parameters and information of a signed request, usable wherever an
+    `oauth2.Request` is: by the stores, the signature methods and
+    `oauth2.Server`. It behaves like a read-mostly dict of parameters.
+    """
+    __slots__ = ('method', 'url', '_normalized_url', '_params', '_raw', '_repeated')
+
+    version = oauth.OAUTH_VERSION
+    body = ''
+    is_form_encoded = False
+
+    def __init__(self, method, url, params, raw):
+        self.method = method.upper()
+        self.url = url
+        self._normalized_url = None
+        # decoded values, and the raw `(source, value)` pairs not read yet
+        self._params = params
+        self._raw = raw
+        # raw `(source, values)` of the parameters given several times
+        self._repeated = dict((key, value) for key, value in raw.iteritems() if isinstance(value[1], list))
+
+    @property
+    def normalized_url(self):
+        if self._normalized_url is None:
+            scheme, netloc, path, query, fragment = urlsplit(self.url)
+            # Exclude default port numbers.
+            if scheme == 'http' and netloc[-3:] == ':80':
+                netloc = netloc[:-3]
+            elif scheme == 'https' and netloc[-4:] == ':443':
+                netloc = netloc[:-4]
+            if scheme not in ('http', 'https'):
+                raise ValueError("Unsupported URL %s (%s)." % (self.url, scheme))
+            self._normalized_url = urlunsplit((scheme, netloc, path, None, None))
+        return self._normalized_url
+
+    def __getitem__(self, key):
+        try:
+            return self._params[key]
+        except KeyError:
+            source, raw = self._raw.pop(key)
+            value = self._params[key] = _decode(source, raw)
+            return value
+
+    def __setitem__(self, key, value):
+        self._raw.pop(key, None)
+        self._repeated.pop(key, None)
+        self._params[key] = value
+
+    def __contains__(self, key):
+        return key in self._params or key in self._raw
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._params) + len(self._raw)
+
+    def _decode_all(self):
+        """Decode the values not read yet and return all the parameters."""
+        if self._raw:
+            params = self._params
+            for key, (source, raw) in self._raw.iteritems():
+                params[key] = _decode(source, raw)
+            self._raw = {}
+        return self._params
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._params.keys() + self._raw.keys()
+
+    def iteritems(self):
+        return self._decode_all().iteritems()
+
+    def items(self):
+        return self._decode_all().items()
+
+    def get_parameter(self, parameter):
+        ret = self.get(parameter)
+        if ret is None:
+            raise oauth.Error('Parameter not found: %s' % parameter)
+        return ret
+
+    def get_nonoauth_parameters(self):
+        """Get any non-OAuth parameters."""
+        return dict((k, v) for k, v in self._decode_all().iteritems() if not k.startswith('oauth_'))
+
+    def _get_timestamp_nonce(self):
+        return self['oauth_timestamp'], self['oauth_nonce']
+
+    def get_normalized_parameters(self):
+        """Return a string that contains the parameters that must be signed."""
+        params = self._decode_all()
+        if self._repeated:
+            params = dict(params)
+            for key, (source, values) in self._repeated.iteritems():
+                params[key] = [_decode(source, value) for value in values]
+        return normalize_parameters(params)
+
+
+def parse_authorization_header(header):
+    """
+    Return the raw parameters of an `OAuth` Authorization header as a dict, or
+    `None` for other authorization schemes. Values are left percent-encoded,
+    keys are decoded.
+    """
+    if header[:6].lower() != 'oauth ':
+        return None
+    params = {}
+    for param in header[6:].split(','):
+        param = param.strip()
+        if not param:
+            continue
+        key, sep, value = param.partition('=')
+        if not sep:
+            raise oauth.Error('Unable to parse OAuth parameters from Authorization header.')
+        key = _decode_key(key.strip(), HEADER)
+        if key != 'realm':
+            params[key] = value.strip().strip('"')
+    return params
+
+
+def parse_query_string(query_string):
+    """
+    Return the raw parameters of a query string as a dict; repeated keys map
+    to a list of their values, in order. Values are left encoded, keys are
+    decoded.
+    """
+    params = {}
+    for pair in _query_separator.split(query_string):
+        if not pair:
+            continue
+        key, sep, value = pair.partition('=')
+        key = _decode_key(key, QUERY)
+        if key in params:
+            if isinstance(params[key], list):
+                params[key].append(value)
+            else:
+                params[key] = [params[key], value]
+        else:
+            params[key] = value
+    return params
+
+
+def parse_request(method, url, authorization=None, query_string=None, form=None):
+    """
+    Build an `OAuthRequest` from the pieces of an HTTP request, or return
+    `None` if it carries no parameter at all. `form` holds the already
+    decoded parameters of a form encoded body. As with `oauth2`, header
+    parameters override form ones and query string parameters override both.
+    """
+    params = dict(form or ())
+    raw = {}
+    if authorization:
+        header_params = parse_authorization_header(authorization)
+        if header_params:
+            raw.update((key, (HEADER, value)) for key, value in header_params.iteritems())
+    if query_string:
+        raw.update((key, (QUERY, value)) for key, value in parse_query_string(query_string).iteritems())
+    if not raw:
+        if not params:
+            return None
+    elif params:
+        for key in raw:
+            params.pop(key, None)
+    return OAuthRequest(method, url, params, raw)
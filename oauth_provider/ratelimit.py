@@ -0,0 +1,107 @@
+"""
+Per-consumer and per-IP rate limiting of OAuth requests.
+
+Enabled by `OAUTH_RATE_LIMIT_ENABLED`. Every limit is a number of requests
+per `OAUTH_RATE_LIMIT_PERIOD` seconds: `OAUTH_IP_RATE_LIMIT` for each client
+address, `OAUTH_CONSUMER_RATE_LIMIT` for each consumer unless its
+`Consumer.rate_limit` is set. `None` means no limit.
+
+Buckets live in the OAuth cache and are only updated with atomic `add()`
+and `incr()`, so all processes share them. A token bucket can't be updated
+atomically with those, so it is approximated by a sliding window: the
+requests of the current fixed window plus those of the previous one,
+weighted by the part of it still inside the period. A client can therefore
+burst up to its limit, then is held to the limit per period.
+"""
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from oauth_provider.caching import get_oauth_cache, make_key, consumer_rate_limit_cache_key, CACHE_TIMEOUT,\
+    is_unknown_consumer, unknown_consumers
+from oauth_provider.models import Consumer
+from oauth_provider.signals import timed
+
+RATE_LIMIT_ENABLED = getattr(settings, 'OAUTH_RATE_LIMIT_ENABLED', False)
+RATE_LIMIT_PERIOD = getattr(settings, 'OAUTH_RATE_LIMIT_PERIOD', 60)
+CONSUMER_RATE_LIMIT = getattr(settings, 'OAUTH_CONSUMER_RATE_LIMIT', None)
+IP_RATE_LIMIT = getattr(settings, 'OAUTH_IP_RATE_LIMIT', None)
+
+# cached for consumers without their own limit
+DEFAULT_LIMIT = -1
+
+
+def consume(kind, key, limit, period=RATE_LIMIT_PERIOD, now=None):
+    """
+    Count a request in the bucket of `key` and return `None` if it is within
+    `limit` requests per `period` seconds, or else the number of seconds
+    after which the client should retry.
+    """
+    if now is None:
+        now = time.time()
+    window, elapsed = divmod(now, period)
+    cache = get_oauth_cache()
+    current_key = make_key('ratelimit:%s:%d' % (kind, window), key)
+    cache.add(current_key, 0, period * 2)
+    try:
+        count = cache.incr(current_key)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.add(current_key, 1, period * 2)
+        count = 1
+    if count <= limit:
+        previous = cache.get(make_key('ratelimit:%s:%d' % (kind, window - 1), key), 0)
+        if previous * (period - elapsed) / period + count <= limit:
+            return None
+    return max(1, int(period - elapsed))
+
+
+def get_consumer_rate_limit(consumer_key):
+    """
+    Return the limit of the consumer with `consumer_key`. It is cached like
+    the consumers themselves, so only the first request of a consumer in
+    `OAUTH_CACHE_TIMEOUT` seconds queries the database. Unknown keys are
+    remembered with those of the store, which then skips its own lookup.
+    """
+    if is_unknown_consumer(consumer_key):
+        return CONSUMER_RATE_LIMIT
+    cache = get_oauth_cache()
+    cache_key = consumer_rate_limit_cache_key(consumer_key)
+    limit = cache.get(cache_key)
+    if limit is None:
+        limits = list(Consumer.objects.filter(key=consumer_key).values_list('rate_limit', flat=True)[:1])
+        if not limits:
+            unknown_consumers.add(consumer_key)
+            return CONSUMER_RATE_LIMIT
+        limit = DEFAULT_LIMIT if limits[0] is None else limits[0]
+        cache.set(cache_key, limit, CACHE_TIMEOUT)
+    return CONSUMER_RATE_LIMIT if limit == DEFAULT_LIMIT else limit
+
+
+def rate_limited_response(retry_after):
+    response = HttpResponse('Rate limit exceeded.', status=429, content_type='text/plain')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def check_rate_limits(request, oauth_request):
+    """
+    Count `request` against the limits of its address and consumer. Return a
+    429 response if one of them is exceeded, `None` otherwise.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with timed(request, 'rate_limit') as timer:
+        retry_after = None
+        if IP_RATE_LIMIT is not None:
+            retry_after = consume('ip', request.META.get('REMOTE_ADDR', ''), IP_RATE_LIMIT)
+        consumer_key = oauth_request.get('oauth_consumer_key')
+        if retry_after is None and consumer_key:
+            limit = get_consumer_rate_limit(consumer_key)
+            if limit is not None:
+                retry_after = consume('consumer', consumer_key, limit)
+        if retry_after is not None:
+            timer.fail('rate_limited')
+            return rate_limited_response(retry_after)
+    return None
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Compare `oauth_provider.parsing` with `oauth2.Request.from_request`.
+
+    python oauth_provider/runtests/bench_parser.py [--number N]
+
+Each case is timed for parsing followed by reading the parameters the
+decorator needs, for parsing followed by normalizing every parameter, and for
+parsing followed by building the HMAC-SHA1 signature base string.
+"""
+import os
+import sys
+import timeit
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'oauth_provider.runtests.settings'
+
+import oauth2 as oauth
+
+from oauth_provider.parsing import parse_request
+from oauth_provider.signatures import SignatureMethod_HMAC_SHA1
+
+URL = 'http://testserver/resource/'
+CONSUMER = oauth.Consumer('dpf43f3p2l4k3l03', 'kd94hf93k423kf44')
+TOKEN = oauth.Token('nnch734d00sl2jdk', 'pfkkdhi9sl3r4s00')
+OAUTH_FIELDS = ('oauth_consumer_key', 'oauth_token', 'oauth_signature_method', 'oauth_signature',
+                'oauth_timestamp', 'oauth_nonce', 'oauth_version')
+
+
+def make_header(extra=0):
+    params = [('oauth_consumer_key', 'dpf43f3p2l4k3l03'), ('oauth_token', 'nnch734d00sl2jdk'),
+              ('oauth_signature_method', 'HMAC-SHA1'), ('oauth_signature', 'tR3%2BTy81lMeYAr%2FFid0kMTYa%2FWM%3D'),
+              ('oauth_timestamp', '1191242096'), ('oauth_nonce', 'kllo9940pd9333jh'), ('oauth_version', '1.0')]
+    params.extend(('x_param_%d' % i, 'value%%20%d' % i) for i in range(extra))
+    return 'OAuth realm="", ' + ', '.join('%s="%s"' % param for param in params)
+
+
+CASES = (
+    ('typical header', make_header(), ''),
+    ('typical header and query string', make_header(), 'file=vacation.jpg&size=original'),
+    ('header with 200 extra parameters', make_header(200), ''),
+)
+
+
+def with_oauth2(header, query_string):
+    return oauth.Request.from_request('GET', URL, headers={'Authorization': header},
+                                      parameters={}, query_string=query_string)
+with_oauth2.signature_method = oauth.SignatureMethod_HMAC_SHA1()
+
+
+def with_parser(header, query_string):
+    return parse_request('GET', URL, authorization=header, query_string=query_string)
+with_parser.signature_method = SignatureMethod_HMAC_SHA1()
+
+
+def read_fields(parse, header, query_string):
+    oauth_request = parse(header, query_string)
+    for field in OAUTH_FIELDS:
+        oauth_request[field]
+
+
+def normalize(parse, header, query_string):
+    parse(header, query_string).get_normalized_parameters()
+
+
+def base_string(parse, header, query_string):
+    parse.signature_method.signing_base(parse(header, query_string), CONSUMER, TOKEN)
+
+
+def main():
+    option_parser = OptionParser()
+    option_parser.add_option('--number', type='int', default=10000,
+                             help='iterations per measurement (default: %default)')
+    options, args = option_parser.parse_args()
+
+    print '%-36s %-10s %12s %12s %8s' % ('case', 'work', 'oauth2 us', 'parser us', 'speedup')
+    for name, header, query_string in CASES:
+        for label, work in (('fields', read_fields), ('normalize', normalize), ('base', base_string)):
+            timings = []
+            for parse in (with_oauth2, with_parser):
+                timer = timeit.Timer(lambda: work(parse, header, query_string))
+                timings.append(min(timer.repeat(3, options.number)) / options.number * 1e6)
+            print '%-36s %-10s %12.1f %12.1f %7.1fx' % (name, label, timings[0], timings[1],
+                                                        timings[0] / timings[1])
+
+
+if __name__ == '__main__':
+    main()
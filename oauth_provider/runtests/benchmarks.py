@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Benchmark the OAuth endpoints and a protected resource, in process.
+
+    python oauth_provider/runtests/benchmarks.py [options]
+
+Correctly signed requests go through the Django test client, against an
+in-memory SQLite database: `request_token`, `user_authorization` (the GET
+rendering the authorize view, then the POST approving the token),
+`access_token` and the `@oauth_required` view `protected_resource_example`.
+For each step the requests per second, latency percentiles and database
+queries per request are reported.
+
+Stores and settings can be compared by running it with different options,
+e.g. `--store oauth_provider.store.cache.CachedModelStore` or
+`--set OAUTH_SIGNATURE_METHODS="['hmac-sha1']"`.
+"""
+import os
+import sys
+import time
+from ast import literal_eval
+from optparse import OptionParser
+from urlparse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['DJANGO_SETTINGS_MODULE'] = 'oauth_provider.runtests.settings'
+
+SERVER = 'http://testserver'
+CALLBACK = 'http://printer.example.com/request_token_ready'
+PERCENTILES = (50, 90, 99)
+
+
+def parse_options():
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-n', '--requests', type='int', default=200,
+                      help='requests per step (default: %default)')
+    parser.add_option('--warmup', type='int', default=10,
+                      help='flows run before measuring (default: %default)')
+    parser.add_option('--store', help='OAUTH_STORE to benchmark')
+    parser.add_option('--nonce-store', help='OAUTH_NONCE_STORE to benchmark')
+    parser.add_option('--signature-method', default='HMAC-SHA1',
+                      help='signature method of the consumer (default: %default)')
+    parser.add_option('--set', action='append', default=[], metavar='NAME=VALUE',
+                      help='override a setting, VALUE being a Python literal')
+    return parser.parse_args()[0]
+
+
+def configure(options):
+    # Settings must be overridden before the package, which reads them at
+    # import time, is loaded.
+    from django.conf import settings
+
+    overrides = {}
+    if options.store:
+        overrides['OAUTH_STORE'] = options.store
+    if options.nonce_store:
+        overrides['OAUTH_NONCE_STORE'] = options.nonce_store
+    for assignment in options.set:
+        name, value = assignment.split('=', 1)
+        overrides[name] = literal_eval(value)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+    import django
+    if django.VERSION >= (1, 7):
+        django.setup()
+    else:
+        from south.management.commands import patch_for_test_db_setup
+        patch_for_test_db_setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    return overrides
+
+
+class Step(object):
+    """Latencies and query counts of the requests of one benchmark step."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = []
+
+    def run(self, func, *args, **kwargs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            response = func(*args, **kwargs)
+            self.latencies.append(time.time() - start)
+        self.queries.append(len(queries))
+        if response.status_code not in (200, 302):
+            raise AssertionError('%s returned %d: %s' % (self.name, response.status_code, response.content))
+        return response
+
+    def percentile(self, percent):
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100.0))]
+
+    def report(self):
+        total = sum(self.latencies)
+        line = '%-24s %6d %9.1f' % (self.name, len(self.latencies), len(self.latencies) / total if total else 0)
+        for percent in PERCENTILES:
+            line += ' %8.2f' % (self.percentile(percent) * 1000)
+        return line + ' %9.2f' % (float(sum(self.queries)) / len(self.queries))
+
+
+class Benchmark(object):
+    def __init__(self, signature_method):
+        import oauth2 as oauth
+        from django.test import Client
+        from oauth_provider.compat import get_user_model
+        from oauth_provider.models import Consumer, Scope
+
+        self.oauth = oauth
+        self.signature_method = {
+            'PLAINTEXT': oauth.SignatureMethod_PLAINTEXT,
+            'HMAC-SHA1': oauth.SignatureMethod_HMAC_SHA1,
+        }[signature_method.upper()]()
+
+        user = get_user_model().objects.create_user('jane', 'jane@example.com', 'toto')
+        Scope.objects.create(name='photos', url='/oauth/photo/')
+        consumer = Consumer.objects.create(key='dpf43f3p2l4k3l03', secret='kd94hf93k423kf44',
+                                           name='printer.example.com', user=user)
+        self.consumer = oauth.Consumer(consumer.key, consumer.secret)
+
+        self.client = Client()
+        self.browser = Client()
+        self.browser.login(username='jane', password='toto')
+
+    def signed_get(self, path, token=None, **parameters):
+        oauth_request = self.oauth.Request.from_consumer_and_token(
+            self.consumer, token, http_method='GET', http_url=SERVER + path, parameters=parameters)
+        oauth_request.sign_request(self.signature_method, self.consumer, token)
+        return self.client.get(path, parameters, HTTP_AUTHORIZATION=oauth_request.to_header()['Authorization'])
+
+    def run(self, count, steps):
+        request_tokens = []
+        for i in range(count):
+            response = steps['request_token'].run(self.signed_get, '/oauth/request_token/',
+                                                  oauth_callback=CALLBACK, scope='photos')
+            params = parse_qs(response.content)
+            request_tokens.append(self.oauth.Token(params['oauth_token'][0], params['oauth_token_secret'][0]))
+
+        for token in request_tokens:
+            steps['user_authorization GET'].run(self.browser.get, '/oauth/authorize/', {'oauth_token': token.key})
+            response = steps['user_authorization POST'].run(
+                self.browser.post, '/oauth/authorize/', {'oauth_token': token.key, 'authorize_access': 1})
+            token.set_verifier(parse_qs(urlparse(response['Location']).query)['oauth_verifier'][0])
+
+        access_tokens = []
+        for token in request_tokens:
+            response = steps['access_token'].run(self.signed_get, '/oauth/access_token/', token,
+                                                 oauth_verifier=token.verifier, scope='photos')
+            params = parse_qs(response.content)
+            access_tokens.append(self.oauth.Token(params['oauth_token'][0], params['oauth_token_secret'][0]))
+
+        for i in range(count):
+            steps['protected resource'].run(self.signed_get, '/oauth/photo/', access_tokens[0])
+
+
+STEPS = ('request_token', 'user_authorization GET', 'user_authorization POST', 'access_token',
+         'protected resource')
+
+
+def main():
+    options = parse_options()
+    overrides = configure(options)
+
+    from django.conf import settings
+    benchmark = Benchmark(options.signature_method)
+    benchmark.run(options.warmup, dict((name, Step(name)) for name in STEPS))
+    steps = dict((name, Step(name)) for name in STEPS)
+    benchmark.run(options.requests, steps)
+
+    print 'store: %s' % getattr(settings, 'OAUTH_STORE', 'oauth_provider.store.db.ModelStore')
+    print 'nonce store: %s' % getattr(settings, 'OAUTH_NONCE_STORE', 'oauth_provider.store.nonce.ModelNonceStore')
+    print 'signature method: %s' % options.signature_method
+    for name, value in sorted(overrides.items()):
+        print '%s = %r' % (name, value)
+    print
+    print '%-24s %6s %9s' % ('step', 'count', 'req/s') + \
+        ''.join(' %8s' % ('p%d ms' % percent) for percent in PERCENTILES) + ' %9s' % 'queries'
+    for name in STEPS:
+        print steps[name].report()
+
+
+if __name__ == '__main__':
+    main()
@@ -13,9 +13,22 @@ def resource_None_scope_view(request):
     return HttpResponse()
 
 
+@oauth_required
+@oauth_required("some")
+def resource_stacked_view(request):
+    return HttpResponse()
+
+
+def user_view(request):
+    return HttpResponse(str(request.user.pk))
+
+
 urlpatterns = [
     url(r'^oauth/', include('oauth_provider.urls')),
+    url(r'^oauth/', include('oauth_provider.metrics_urls')),
     url(r'^oauth/photo/$', protected_resource_example, name='oauth_example'),
     url(r'^oauth/some/$', resource_some_scope_view, name='oauth_resource_some_scope'),
     url(r'^oauth/none/$', resource_None_scope_view, name='oauth_resource_None_scope'),
+    url(r'^oauth/stacked/$', resource_stacked_view, name='oauth_resource_stacked'),
+    url(r'^oauth/user/$', user_view, name='oauth_user'),
 ]
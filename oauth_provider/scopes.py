@@ -0,0 +1,198 @@
+"""
+Process-wide registry of the scopes. They are few and rarely change, so
+each process loads them all once and resolves scope names and checks with
+dictionary lookups.
+
+The paths of their `url`s are compiled into a single regular expression,
+which maps a request path to the scopes it requires in one match.
+
+Saving or deleting a `Scope` reloads the registry of the process, and
+changes the version kept in the OAuth cache, once committed. Other processes
+check it every `OAUTH_SCOPES_CHECK_INTERVAL` seconds. Cached access tokens are
+keyed by that version, as the bits of their scopes may change meaning.
+"""
+import operator
+import re
+import threading
+import time
+import uuid
+from urlparse import urlparse
+
+from django.conf import settings
+
+from oauth_provider.caching import get_oauth_cache, CACHE_PREFIX, CACHE_TIMEOUT
+from oauth_provider.compat import on_commit
+
+SCOPES_CHECK_INTERVAL = getattr(settings, 'OAUTH_SCOPES_CHECK_INTERVAL', 5)
+SCOPES_VERSION_CACHE_KEY = '%s:scopes_version' % CACHE_PREFIX
+
+
+class _Scopes(object):
+    """One loaded state of the registry, replaced as a whole on reload."""
+    __slots__ = ('by_id', 'by_name', 'masks', 'url_pattern', 'url_masks')
+
+
+class ScopeRegistry(object):
+    """
+    All `Scope` rows by id and by name. The scopes it returns are shared by
+    all requests of the process and must not be modified.
+    """
+    def __init__(self, check_interval=SCOPES_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._scopes = None
+        self._version = None
+        self._checked = 0
+
+    def _load(self):
+        from oauth_provider.models import Scope
+        by_id, by_name = {}, {}
+        for scope in Scope.objects.order_by('pk'):
+            by_id[scope.pk] = scope
+            by_name.setdefault(scope.name, []).append(scope)
+        granting = dict((pk, self._granting_mask(by_id, scope)) for pk, scope in by_id.iteritems())
+
+        scopes = _Scopes()
+        scopes.by_id = by_id
+        scopes.by_name = dict((name, same[0]) for name, same in by_name.iteritems())
+        scopes.masks = dict((name, reduce(operator.or_, [granting[scope.pk] for scope in same]))
+                            for name, same in by_name.iteritems())
+        scopes.url_pattern, scopes.url_masks = self._compile_urls(by_id.itervalues(), granting)
+        return scopes
+
+    def _compile_urls(self, scopes, granting):
+        # any of the scopes of the longest matching path is required
+        url_masks = {}
+        for scope in scopes:
+            path = urlparse(scope.url).path
+            if path:
+                url_masks[path] = url_masks.get(path, 0) | granting[scope.pk]
+        if not url_masks:
+            return None, ()
+        # one group per path, MAX_SCOPES at most, below the 100 groups of `re`
+        paths = sorted(url_masks, key=len, reverse=True)
+        # a path without a trailing slash only matches whole segments
+        pattern = '|'.join('(%s%s)' % (re.escape(path), '' if path.endswith('/') else '(?=/|$)')
+                           for path in paths)
+        return re.compile(pattern), tuple(url_masks[path] for path in paths)
+
+    def _granting_mask(self, by_id, scope):
+        # the bits of the scope and of its ancestors, which all imply it
+        mask, seen = 0, set()
+        while scope is not None and scope.pk not in seen:
+            mask |= scope.mask
+            seen.add(scope.pk)
+            scope = by_id.get(scope.parent_id)
+        return mask
+
+    def _check_version(self):
+        # with the lock held; drops the scopes of an older version
+        cache = get_oauth_cache()
+        version = cache.get(SCOPES_VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(SCOPES_VERSION_CACHE_KEY, uuid.uuid4().hex, CACHE_TIMEOUT)
+            version = cache.get(SCOPES_VERSION_CACHE_KEY)
+        if version != self._version:
+            self._scopes = None
+            self._version = version
+        self._checked = time.time()
+        return version
+
+    def _get_scopes(self):
+        scopes = self._scopes
+        if scopes is not None and time.time() - self._checked < self.check_interval:
+            return scopes
+        with self._lock:
+            self._check_version()
+            if self._scopes is None:
+                self._scopes = self._load()
+            return self._scopes
+
+    @property
+    def version(self):
+        """
+        The version of the scopes, changed by every `Scope` change. Unlike
+        the lookups, it does not load the scopes.
+        """
+        version = self._version
+        if version is not None and time.time() - self._checked < self.check_interval:
+            return version
+        with self._lock:
+            return self._check_version()
+
+    def get(self, scope_id):
+        """Return the scope with `scope_id`, or `None`."""
+        return self._get_scopes().by_id.get(scope_id)
+
+    def get_by_name(self, name):
+        """Return the scope named `name` (the first one if there are several), or `None`."""
+        return self._get_scopes().by_name.get(name)
+
+    def get_all_by_names(self, value):
+        """
+        Return the scopes named in `value`, a scope name or several separated
+        by spaces, or `None` if one of them does not exist.
+        """
+        by_name = self._get_scopes().by_name
+        if value in by_name:
+            return [by_name[value]]
+        scopes = [by_name.get(name) for name in value.split()]
+        if not scopes or None in scopes:
+            return None
+        return scopes
+
+    def get_by_mask(self, mask):
+        """Return the scopes whose bits are set in `mask`, by id."""
+        return [scope for scope in sorted(self._get_scopes().by_id.itervalues(), key=lambda scope: scope.pk)
+                if mask & scope.mask]
+
+    def mask(self, *names):
+        """
+        Return the bits of the scopes named `names` and of their ancestors,
+        to be matched against `Token.scopes`: a token with any of them has
+        one of the scopes. Unknown names have none.
+        """
+        masks = self._get_scopes().masks
+        result = 0
+        for name in names:
+            result |= masks.get(name, 0)
+        return result
+
+    def url_mask(self, path):
+        """
+        Return the mask of the scopes required by `path`, any of which grants
+        access, or 0 if no scope `url` is a prefix of it.
+        """
+        scopes = self._get_scopes()
+        if scopes.url_pattern is None:
+            return 0
+        match = scopes.url_pattern.match(path)
+        if match is None:
+            return 0
+        return scopes.url_masks[match.lastindex - 1]
+
+    def is_readonly(self, scope_id):
+        scope = self.get(scope_id)
+        return scope is not None and scope.is_readonly
+
+    def clear(self):
+        with self._lock:
+            self._scopes = None
+            self._version = None
+
+
+registry = ScopeRegistry()
+
+
+def _change_version():
+    get_oauth_cache().set(SCOPES_VERSION_CACHE_KEY, uuid.uuid4().hex, CACHE_TIMEOUT)
+    registry.clear()
+
+
+def invalidate_scopes(sender, instance, **kwargs):
+    """
+    `post_save`/`post_delete` handler for `Scope`. The version changes once
+    the transaction is committed: a process reloading earlier would keep the
+    old scopes under the new version.
+    """
+    on_commit(_change_version)
@@ -0,0 +1,69 @@
+"""
+Timing of the stages of OAuth request handling.
+
+`stage_timed` is sent after each instrumented stage with:
+
+- `request`: the Django request;
+- `stage`: `'parse'`, `'resolve'` (Consumer and Token lookup) or the name of
+  a verification stage such as `'check_signature'` or `'check_nonce'`;
+- `duration`: wall time of the stage, in seconds;
+- `outcome`: `'ok'`, or why the request was rejected.
+
+Nothing is timed nor sent while the signal has no receivers.
+"""
+import time
+
+from django.dispatch import Signal
+
+stage_timed = Signal(providing_args=['request', 'stage', 'duration', 'outcome'])
+
+
+class _Timer(object):
+    __slots__ = ('request', 'stage', 'outcome', 'start')
+
+    def __init__(self, request, stage):
+        self.request = request
+        self.stage = stage
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.time() - self.start
+        if exc_type is not None:
+            self.outcome = getattr(exc_value, 'reason', 'error')
+        stage_timed.send(sender=None, request=self.request, stage=self.stage, duration=duration,
+                         outcome=self.outcome)
+        return False
+
+    def fail(self, outcome):
+        """Record that the stage rejected the request, for `outcome`."""
+        self.outcome = outcome
+
+
+class _NoTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def fail(self, outcome):
+        pass
+
+_no_timer = _NoTimer()
+
+
+def timed(request, stage):
+    """
+    Return a context manager timing `stage` of the handling of `request` and
+    sending `stage_timed` when it exits. Exceptions are reported with their
+    `reason` attribute as outcome, or `'error'`.
+    """
+    if not stage_timed.receivers:
+        return _no_timer
+    return _Timer(request, stage)
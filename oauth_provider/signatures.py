@@ -0,0 +1,205 @@
+"""
+Process-wide signature engine.
+
+Signature methods are instantiated once, from `OAUTH_SIGNATURE_METHODS`, and
+shared by every request; consumers and tokens are reduced to ascii-encoded
+`Credentials` records once per object instead of being re-wrapped into
+`oauth2` objects for each verification.
+"""
+import binascii
+import hmac
+from collections import namedtuple
+from hashlib import sha256
+
+import oauth2 as oauth
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from oauth_provider.caching import LRUCache
+from oauth_provider.parsing import escape
+
+try:
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:
+    x509 = None
+
+OAUTH_SIGNATURE_METHODS = getattr(settings, 'OAUTH_SIGNATURE_METHODS', ['plaintext', 'hmac-sha1'])
+RSA_KEY_CACHE_SIZE = getattr(settings, 'OAUTH_RSA_KEY_CACHE_SIZE', 256)
+
+Credentials = namedtuple('Credentials', 'key secret rsa_public_key')
+Credentials.__new__.__defaults__ = (None,)
+
+
+def signature_base_string(request):
+    """Return the signature base string of `request`, as ascii bytes."""
+    return '&'.join((
+        escape(request.method),
+        escape(request.normalized_url),
+        escape(request.get_normalized_parameters()),
+    ))
+
+
+class SignatureMethod_HMAC_SHA1(oauth.SignatureMethod_HMAC_SHA1):
+    """`oauth2`'s HMAC-SHA1 with the package's signature base string."""
+
+    def signing_base(self, request, consumer, token):
+        key = escape(consumer.secret) + '&'
+        if token:
+            key += escape(token.secret)
+        return key, signature_base_string(request)
+
+
+class SignatureMethod_HMAC_SHA256(SignatureMethod_HMAC_SHA1):
+    name = 'HMAC-SHA256'
+
+    def sign(self, request, consumer, token):
+        key, raw = self.signing_base(request, consumer, token)
+        return binascii.b2a_base64(hmac.new(key, raw, sha256).digest())[:-1]
+
+
+_public_keys = LRUCache(RSA_KEY_CACHE_SIZE)
+
+def load_rsa_public_key(pem):
+    """
+    Return the parsed public key of a PEM encoded public key or X.509
+    certificate. Parsed keys are kept in an in-process LRU cache of
+    `OAUTH_RSA_KEY_CACHE_SIZE` entries, so each key is parsed once per
+    process. Raises `ValueError` for invalid data.
+    """
+    if x509 is None:
+        raise ImproperlyConfigured('RSA keys require the "cryptography" package.')
+    key = _public_keys.get(pem)
+    if key is None:
+        try:
+            data = pem.encode('ascii')
+            if 'CERTIFICATE' in data:
+                key = x509.load_pem_x509_certificate(data, default_backend()).public_key()
+            else:
+                key = serialization.load_pem_public_key(data, default_backend())
+        except (UnicodeError, UnsupportedAlgorithm), e:
+            raise ValueError(str(e))
+        _public_keys.set(pem, key)
+    return key
+
+
+class SignatureMethod_RSA_SHA1(oauth.SignatureMethod):
+    """
+    RSA-SHA1 verification against the consumer's `rsa_public_key`. Requires
+    the `cryptography` package.
+    """
+    name = 'RSA-SHA1'
+
+    def __init__(self):
+        if x509 is None:
+            raise ImproperlyConfigured('RSA keys require the "cryptography" package.')
+
+    def signing_base(self, request, consumer, token):
+        return '', signature_base_string(request)
+
+    def check(self, request, consumer, token, signature):
+        if not consumer.rsa_public_key:
+            return False
+        try:
+            key = load_rsa_public_key(consumer.rsa_public_key)
+            key.verify(binascii.a2b_base64(signature), signature_base_string(request),
+                       padding.PKCS1v15(), hashes.SHA1())
+        except (ValueError, TypeError, binascii.Error, InvalidSignature):
+            return False
+        return True
+
+
+SIGNATURE_METHODS = {
+    'plaintext': oauth.SignatureMethod_PLAINTEXT,
+    'hmac-sha1': SignatureMethod_HMAC_SHA1,
+    'hmac-sha256': SignatureMethod_HMAC_SHA256,
+    'rsa-sha1': SignatureMethod_RSA_SHA1,
+}
+
+
+def credentials(obj):
+    """
+    Return the `Credentials` of a Consumer or Token (or `None`), with key and
+    secret encoded to ascii as HMAC requires. The record is memoized on `obj`
+    for as long as its secret and RSA key do not change.
+    """
+    if obj is None:
+        return None
+    rsa_public_key = getattr(obj, 'rsa_public_key', None) or None
+    cached = getattr(obj, '_oauth_credentials', None)
+    if cached is None or cached[0] is not obj.secret or cached[1] is not rsa_public_key:
+        cached = obj._oauth_credentials = (obj.secret, rsa_public_key, Credentials(
+            obj.key.encode('ascii', 'ignore'), obj.secret.encode('ascii', 'ignore'), rsa_public_key))
+    return cached[2]
+
+
+class SignatureEngine(object):
+    """
+    Registry of signature method instances and verification of requests
+    against `Credentials` records.
+    """
+    version = oauth.OAUTH_VERSION
+
+    def __init__(self, methods=()):
+        self.methods = {}
+        self._server = None
+        for method in methods:
+            self.register(method)
+
+    def register(self, method):
+        self.methods[method.name] = method
+        self._server = None
+
+    def get_method(self, name):
+        try:
+            return self.methods[name]
+        except KeyError:
+            raise oauth.Error('Signature method %s not supported try one of the following: %s'
+                              % (name, ', '.join(self.methods.keys())))
+
+    def verify(self, oauth_request, consumer, token=None):
+        """
+        Check the version and signature of `oauth_request`, raising
+        `oauth2.Error` if they are not valid. `consumer` and `token` are
+        `Credentials` records.
+        """
+        version = oauth_request.get('oauth_version')
+        if version and version != self.version:
+            raise oauth.Error('OAuth version %s not supported.' % str(version))
+
+        method = self.get_method(oauth_request.get('oauth_signature_method', oauth.SIGNATURE_METHOD))
+
+        signature = oauth_request.get('oauth_signature')
+        if signature is None:
+            raise oauth.MissingSignature('Missing oauth_signature.')
+
+        if not method.check(oauth_request, consumer, token, signature):
+            raise oauth.Error('Invalid signature.')
+
+    def as_server(self):
+        """Return a shared `oauth2.Server` using the registered methods."""
+        if self._server is None:
+            self._server = oauth.Server(dict(self.methods))
+        return self._server
+
+
+def get_engine(names=None):
+    """
+    Build a `SignatureEngine` for `names`, which defaults to the
+    `OAUTH_SIGNATURE_METHODS` setting. Should not be called directly unless
+    testing.
+    """
+    methods = []
+    for name in names or OAUTH_SIGNATURE_METHODS:
+        try:
+            methods.append(SIGNATURE_METHODS[name.lower()]())
+        except KeyError:
+            raise ImproperlyConfigured('Unknown OAuth signature method "%s"' % name)
+    return SignatureEngine(methods)
+
+
+engine = get_engine()
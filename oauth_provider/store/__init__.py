@@ -116,6 +116,7 @@ class Store(object):
     def get_access_token(self, request, oauth_request, consumer, access_token_key):
         """
         Return the Token for `access_token_key` or raise `InvalidTokenError`.
+        The Token must belong to `consumer`.
 
         `request`: The Django request object.
         `oauth_request`: The `oauth2.Request` object.
@@ -124,6 +125,24 @@ class Store(object):
         """
         raise NotImplementedError
 
+    def get_consumer_and_access_token(self, request, oauth_request, consumer_key, access_token_key):
+        """
+        Return a `(consumer, access_token)` tuple for a protected resource
+        request. Raise `InvalidConsumerError` if there is no Consumer for
+        `consumer_key` and `InvalidTokenError` if there is no access Token for
+        `access_token_key` belonging to that Consumer.
+
+        The default implementation combines `get_consumer` and
+        `get_access_token`; stores can override it to resolve both at once.
+
+        `request`: The Django request object.
+        `oauth_request`: The `oauth2.Request` object.
+        `consumer_key`: The consumer key.
+        `access_token_key`: The token key used to make the request.
+        """
+        consumer = self.get_consumer(request, oauth_request, consumer_key)
+        return consumer, self.get_access_token(request, oauth_request, consumer, access_token_key)
+
     def get_user_for_access_token(self, request, oauth_request, access_token):
         """
         Return the associated User for `access_token`.
@@ -157,23 +176,34 @@ class Store(object):
         raise NotImplementedError
 
 
+def _load_class(path, kind):
+    try:
+        module, attr = path.rsplit('.', 1)
+        return getattr(importlib.import_module(module), attr)
+    except ValueError:
+        raise ImproperlyConfigured('Invalid oauth %s string: "%s"' % (kind, path))
+    except ImportError, e:
+        raise ImproperlyConfigured('Error loading oauth %s module "%s": "%s"' % (kind, module, e))
+    except AttributeError:
+        raise ImproperlyConfigured('Module "%s" does not define an oauth %s named "%s"' % (module, kind, attr))
+
+
 def get_store(path='oauth_provider.store.db.ModelStore'):
     """
     Load the oauth store. Should not be called directly unless testing.
     """
     path = getattr(settings, 'OAUTH_STORE', path)
+    return _load_class(path, 'store')()
 
-    try:
-        module, attr = path.rsplit('.', 1)
-        store_class = getattr(importlib.import_module(module), attr)
-    except ValueError:
-        raise ImproperlyConfigured('Invalid oauth store string: "%s"' % path)
-    except ImportError, e:
-        raise ImproperlyConfigured('Error loading oauth store module "%s": "%s"' % (module, e))
-    except AttributeError:
-        raise ImproperlyConfigured('Module "%s" does not define an oauth store named "%s"' % (module, attr))
 
-    return store_class()
+def get_nonce_store(path='oauth_provider.store.nonce.ModelNonceStore'):
+    """
+    Load the nonce store used by `ModelStore.check_nonce`. Should not be called
+    directly unless testing.
+    """
+    path = getattr(settings, 'OAUTH_NONCE_STORE', path)
+    return _load_class(path, 'nonce store')()
 
 
+nonce_store = get_nonce_store()
 store = get_store()
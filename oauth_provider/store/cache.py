@@ -0,0 +1,54 @@
+from oauth_provider import caching
+from oauth_provider.caching import get_oauth_cache, consumer_cache_key, access_token_cache_key,\
+    MISSING, CACHE_TIMEOUT, CACHE_NEGATIVE_TIMEOUT
+from oauth_provider.store import InvalidConsumerError, InvalidTokenError
+from oauth_provider.store.db import ModelStore
+
+
+class CachedModelStore(ModelStore):
+    """
+    `ModelStore` with a read-through cache in front of the consumer and access
+    token lookups made by every protected request.
+
+    Enable it with `OAUTH_STORE = 'oauth_provider.store.cache.CachedModelStore'`.
+    Entries live for `OAUTH_CACHE_TIMEOUT` seconds, unknown keys are remembered
+    for `OAUTH_CACHE_NEGATIVE_TIMEOUT` seconds and both are dropped as soon as
+    the matching `Consumer` or `Token` is saved or deleted.
+    """
+    def _get_or_fetch(self, cache_key, error_class, fetch, *args):
+        cache = get_oauth_cache()
+        obj = cache.get(cache_key)
+        if obj == MISSING:
+            raise error_class()
+        if obj is None:
+            try:
+                obj = fetch(*args)
+            except error_class:
+                cache.set(cache_key, MISSING, CACHE_NEGATIVE_TIMEOUT)
+                raise
+            cache.set(cache_key, obj, CACHE_TIMEOUT)
+        return obj
+
+    def get_consumer(self, request, oauth_request, consumer_key):
+        # keys this process already knows to be unknown skip the cache too
+        if caching.is_unknown_consumer(consumer_key):
+            raise InvalidConsumerError()
+        return self._get_or_fetch(consumer_cache_key(consumer_key), InvalidConsumerError,
+                                  super(CachedModelStore, self).get_consumer,
+                                  request, oauth_request, consumer_key)
+
+    def get_access_token(self, request, oauth_request, consumer, access_token_key):
+        # cached by key alone, so the consumer binding is checked afterwards
+        if access_token_key in caching.unknown_access_tokens:
+            raise InvalidTokenError()
+        token = self._get_or_fetch(access_token_cache_key(access_token_key), InvalidTokenError,
+                                   self._fetch_access_token, access_token_key)
+        if token.consumer_id != consumer.pk:
+            raise InvalidTokenError()
+        return token
+
+    def get_consumer_and_access_token(self, request, oauth_request, consumer_key, access_token_key):
+        consumer = self.get_consumer(request, oauth_request, consumer_key)
+        token = self.get_access_token(request, oauth_request, consumer, access_token_key)
+        token.consumer = consumer
+        return consumer, token
@@ -1,10 +1,13 @@
+import operator
+
 import oauth2 as oauth
 
 from django.conf import settings
-from oauth_provider.compat import now
 
-from oauth_provider.store import InvalidConsumerError, InvalidTokenError, Store
-from oauth_provider.models import Nonce, Token, Consumer, Scope, VERIFIER_SIZE
+from oauth_provider import caching
+from oauth_provider.scopes import registry as scopes
+from oauth_provider.store import InvalidConsumerError, InvalidTokenError, Store, nonce_store
+from oauth_provider.models import Token, Consumer, VERIFIER_SIZE
 
 NONCE_VALID_PERIOD = getattr(settings, "OAUTH_NONCE_VALID_PERIOD", None)
 
@@ -13,9 +16,12 @@ class ModelStore(Store):
     Store implementation using the Django models defined in `piston.models`.
     """
     def get_consumer(self, request, oauth_request, consumer_key):
+        if caching.is_unknown_consumer(consumer_key):
+            raise InvalidConsumerError()
         try:
             return Consumer.objects.get(key=consumer_key)
         except Consumer.DoesNotExist:
+            caching.unknown_consumers.add(consumer_key)
             raise InvalidConsumerError()
 
     def get_consumer_for_request_token(self, request, oauth_request, request_token):
@@ -26,19 +32,22 @@ class ModelStore(Store):
 
     def create_request_token(self, request, oauth_request, consumer, callback):
         try:
-            scope = Scope.objects.get(name=oauth_request.get_parameter('scope'))
+            scope_name = oauth_request.get_parameter('scope')
         except oauth.Error:
             # oauth.Error means that scope wasn't specified
-            scope = None
-        except Scope.DoesNotExist:
-            # Scope.DoesNotExist means that specified scope doesn't exist in db
-            raise oauth.Error('Scope does not exist.')
+            requested = [None]
+        else:
+            # one scope name, or several separated by spaces
+            requested = scopes.get_all_by_names(scope_name)
+            if requested is None:
+                raise oauth.Error('Scope does not exist.')
         
         token = Token.objects.create_token(
             token_type=Token.REQUEST,
             consumer=Consumer.objects.get(key=oauth_request['oauth_consumer_key']),
             timestamp=oauth_request['oauth_timestamp'],
-            scope=scope,
+            scope=requested[0],
+            scopes=reduce(operator.or_, [scope.mask for scope in requested if scope is not None], 0),
         )
         token.set_callback(callback)
         token.save()
@@ -66,16 +75,41 @@ class ModelStore(Store):
             consumer=Consumer.objects.get(key=consumer.key),
             user=request_token.user,
             scope=scope,
+            scopes=request_token.scopes,
         )
         request_token.delete()
         return access_token
 
-    def get_access_token(self, request, oauth_request, consumer, access_token_key):
+    def _fetch_access_token(self, access_token_key, queryset=Token.objects):
+        # fetched by key alone, so a miss means the key does not exist at all
+        if access_token_key in caching.unknown_access_tokens:
+            raise InvalidTokenError()
         try:
-            return Token.objects.get(key=access_token_key, token_type=Token.ACCESS)
+            return queryset.get(key=access_token_key, token_type=Token.ACCESS)
         except Token.DoesNotExist:
+            caching.unknown_access_tokens.add(access_token_key)
             raise InvalidTokenError()
 
+    def get_access_token(self, request, oauth_request, consumer, access_token_key):
+        token = self._fetch_access_token(access_token_key)
+        if token.consumer_id != consumer.pk:
+            raise InvalidTokenError()
+        return token
+
+    def get_consumer_and_access_token(self, request, oauth_request, consumer_key, access_token_key):
+        if caching.is_unknown_consumer(consumer_key):
+            raise InvalidConsumerError()
+        try:
+            # the user and scope are loaded only if used
+            token = self._fetch_access_token(access_token_key, Token.objects.select_related('consumer'))
+            if token.consumer.key != consumer_key:
+                raise InvalidTokenError()
+        except InvalidTokenError:
+            # tell an unknown consumer from an unknown token, failures only
+            self.get_consumer(request, oauth_request, consumer_key)
+            raise
+        return token.consumer, token
+
     def get_user_for_access_token(self, request, oauth_request, access_token):
         return access_token.user
 
@@ -83,14 +117,4 @@ class ModelStore(Store):
         return consumer.user
 
     def check_nonce(self, request, oauth_request, nonce, timestamp=0):
-        timestamp = int(timestamp)
-
-        if NONCE_VALID_PERIOD and int(now().strftime("%s")) - timestamp > NONCE_VALID_PERIOD:
-            return False
-
-        nonce, created = Nonce.objects.get_or_create(
-            consumer_key=oauth_request['oauth_consumer_key'],
-            token_key=oauth_request.get('oauth_token', ''),
-            key=nonce, timestamp=timestamp,
-        )
-        return created
+        return nonce_store.check_nonce(request, oauth_request, nonce, timestamp)
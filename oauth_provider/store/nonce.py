@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError
+
+from oauth_provider.caching import make_key, CACHE_ALIAS
+from oauth_provider.compat import now, get_cache, atomic
+from oauth_provider.models import Nonce
+
+NONCE_VALID_PERIOD = getattr(settings, "OAUTH_NONCE_VALID_PERIOD", None)
+NONCE_CACHE_ALIAS = getattr(settings, "OAUTH_NONCE_CACHE_ALIAS", CACHE_ALIAS)
+
+
+def current_timestamp():
+    return int(now().strftime("%s"))
+
+
+def is_expired(timestamp):
+    """
+    Return `True` if `timestamp` is more than `OAUTH_NONCE_VALID_PERIOD` away
+    from now, in the past or in the future.
+    """
+    return bool(NONCE_VALID_PERIOD) and abs(current_timestamp() - timestamp) > NONCE_VALID_PERIOD
+
+
+class NonceStore(object):
+    """
+    Replay protection used by `ModelStore.check_nonce`. It is configured on its
+    own with `OAUTH_NONCE_STORE`, so nonces can live somewhere else than
+    consumers and tokens.
+    """
+    def check_nonce(self, request, oauth_request, nonce, timestamp):
+        """
+        Return `True` if the nonce has not yet been used, `False` otherwise.
+
+        `request`: The Django request object.
+        `oauth_request`: The `oauth2.Request` object.
+        `nonce`: The nonce to check.
+        `timestamp`: nonce timestamp.
+        """
+        raise NotImplementedError
+
+
+class ModelNonceStore(NonceStore):
+    """
+    Nonce store keeping one `Nonce` row per signed request. The row is simply
+    inserted; the unique index on `Nonce` turns a replay into an integrity
+    error, which is race-free and saves the SELECT of `get_or_create`.
+    """
+    def check_nonce(self, request, oauth_request, nonce, timestamp=0):
+        timestamp = int(timestamp)
+
+        if is_expired(timestamp):
+            return False
+
+        try:
+            with atomic():
+                Nonce.objects.create(
+                    consumer_key=oauth_request['oauth_consumer_key'],
+                    token_key=oauth_request.get('oauth_token', ''),
+                    key=nonce, timestamp=timestamp,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+
+class CacheNonceStore(NonceStore):
+    """
+    Nonce store relying on the atomic `add()` of a shared cache (memcached,
+    Redis, ...). Entries expire `OAUTH_NONCE_VALID_PERIOD` seconds after their
+    timestamp, when the timestamp check alone rejects the request. The cache is selected with
+    `OAUTH_NONCE_CACHE_ALIAS`; `LocMemCache` works as a single process
+    stand-in, e.g. for tests.
+    """
+    def __init__(self):
+        if not NONCE_VALID_PERIOD:
+            raise ImproperlyConfigured('CacheNonceStore requires OAUTH_NONCE_VALID_PERIOD to be set.')
+
+    def check_nonce(self, request, oauth_request, nonce, timestamp=0):
+        timestamp = int(timestamp)
+
+        if is_expired(timestamp):
+            return False
+
+        key = make_key('nonce', '\n'.join((
+            oauth_request['oauth_consumer_key'],
+            oauth_request.get('oauth_token', ''),
+            nonce, str(timestamp),
+        )))
+        timeout = timestamp + NONCE_VALID_PERIOD - current_timestamp() + 1
+        return get_cache(NONCE_CACHE_ALIAS).add(key, 1, timeout)
@@ -5,6 +5,7 @@ import re
 from urlparse import parse_qs, urlparse
 from django.test import TestCase, Client
 
+import mock
 import oauth2 as oauth
 
 from oauth_provider.models import Scope, Consumer, Token
@@ -17,8 +18,19 @@ METHOD_POST_REQUEST_BODY = 1
 METHOD_URL_QUERY = 2
 
 
+def commit_scope_changes_at_once(test):
+    """
+    Scope changes reach the registry once committed, which never happens in
+    a `TestCase`: make them take effect at once during `test`.
+    """
+    patcher = mock.patch('oauth_provider.scopes.on_commit', lambda func: func())
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
 class BaseOAuthTestCase(TestCase):
     def setUp(self):
+        commit_scope_changes_at_once(self)
         self.username = 'jane'
         self.password = 'toto'
         self.email = 'jane@example.com'
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import time
+try:
+    from unittest import skipIf
+except ImportError:
+    from django.utils.unittest import skipIf
+
+from django.test.client import RequestFactory
+
+from oauth_provider.models import Token
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+try:
+    from rest_framework import exceptions
+    from rest_framework.request import Request
+    from oauth_provider.authentication import OAuthAuthentication
+except ImportError:
+    Request = None
+
+
+@skipIf(Request is None, 'djangorestframework is not installed')
+class OAuthAuthenticationTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(OAuthAuthenticationTest, self).setUp()
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+
+    def _request(self, **parameters):
+        parameters = dict({
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_version': '1.0',
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': 'nonce',
+            'oauth_signature': '%s&%s' % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }, **parameters)
+        return Request(RequestFactory().get('/api/', parameters))
+
+    def test_authenticate(self):
+        user, token = OAuthAuthentication().authenticate(self._request())
+        self.assertEqual(user, self.jane)
+        self.assertEqual(token, Token.objects.get(key=self.ACCESS_TOKEN_KEY))
+
+    def test_token_without_user(self):
+        Token.objects.filter(key=self.ACCESS_TOKEN_KEY).update(user=None)
+        user, token = OAuthAuthentication().authenticate(self._request())
+        self.assertTrue(user.is_anonymous())
+        self.assertEqual(token.key, self.ACCESS_TOKEN_KEY)
+
+    def test_request_without_credentials(self):
+        self.assertEqual(OAuthAuthentication().authenticate(Request(RequestFactory().get('/api/'))), None)
+
+    def test_invalid_signature(self):
+        self.assertRaises(exceptions.AuthenticationFailed, OAuthAuthentication().authenticate,
+                          self._request(oauth_signature='wrong&wrong'))
+
+    def test_verified_once(self):
+        request = self._request()
+        authentication = OAuthAuthentication()
+        self.assertEqual(authentication.authenticate(request), authentication.authenticate(request))
+
+    def test_authenticate_header(self):
+        self.assertTrue(OAuthAuthentication().authenticate_header(self._request()).startswith('OAuth realm='))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import time
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from oauth_provider.models import Nonce, Consumer, Token
+
+
+class PruneOAuthNoncesTest(TestCase):
+    def setUp(self):
+        now = int(time.time())
+        for i in range(5):
+            Nonce.objects.create(consumer_key='consumer', token_key='', key='old%d' % i, timestamp=now - 1000)
+        Nonce.objects.create(consumer_key='consumer', token_key='', key='fresh', timestamp=now)
+
+    def test_delete_expired_in_chunks(self):
+        # 3 chunks: 2 + 2 + 1 rows
+        with self.assertNumQueries(6):
+            deleted = Nonce.objects.delete_expired(int(time.time()) - 500, chunk_size=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(list(Nonce.objects.values_list('key', flat=True)), ['fresh'])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('prune_oauth_nonces', max_age=500, chunk_size=2, stdout=out)
+        self.assertEqual(out.getvalue(), 'Deleted 5 nonces.\n')
+        self.assertEqual(Nonce.objects.count(), 1)
+
+    def test_command_uses_nonce_valid_period(self):
+        # OAUTH_NONCE_VALID_PERIOD is 120 in the test settings
+        call_command('prune_oauth_nonces', verbosity=0)
+        self.assertEqual(Nonce.objects.count(), 1)
+
+
+class CheckOAuthKeysTest(TestCase):
+    def test_no_duplicates(self):
+        consumer = Consumer.objects.create(name='example', key='consumerkey', secret='secret')
+        Token.objects.create_token(consumer=consumer, token_type=Token.ACCESS, timestamp=0, scope=None)
+        out = StringIO()
+        call_command('check_oauth_keys', stdout=out)
+        self.assertEqual(out.getvalue(), 'No duplicate keys found.\n')
@@ -2,7 +2,12 @@
 from pprint import pprint
 import time
 import urllib
-from oauth_provider.models import Scope
+
+from django.test.client import RequestFactory
+
+from oauth_provider.scopes import registry as scopes
+from oauth_provider.models import Scope, Consumer, Nonce
+from oauth_provider.utils import get_oauth_request
 from oauth_provider.tests.auth import BaseOAuthTestCase, METHOD_POST_REQUEST_BODY, METHOD_AUTHORIZATION_HEADER, METHOD_URL_QUERY
 
 
@@ -58,6 +63,19 @@ class OAuthTestOauthRequiredDecorator(BaseOAuthTestCase):
         response = self._oauth_signed_get("/oauth/some/")
         self.assertEqual(response.status_code, 401)
 
+    def test_renamed_scope_view_not_authorized(self):
+        """Tests that scope names cached for the check follow changes to scopes
+        """
+        self.scope = Scope.objects.create(name="some")
+        self._request_token(scope=self.scope.name)
+        self._authorize_and_access_token_using_form()
+        self.assertEqual(scopes.mask("some"), self.scope.mask)
+
+        self.scope.name = "other"
+        self.scope.save()
+        response = self._oauth_signed_get("/oauth/some/")
+        self.assertEqual(response.status_code, 401)
+
     def test_resource_None_view(self):
         """Tests that view created using @oauth_required decorator gives access
         when requested using token without scope specified
@@ -103,4 +121,30 @@ class OAuthTestOauthRequiredDecorator(BaseOAuthTestCase):
         self._authorize_and_access_token_using_form()
 
         response = self._oauth_signed_get("/oauth/none/", method=METHOD_POST_REQUEST_BODY)
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_token_of_other_consumer_is_rejected(self):
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+
+        Consumer.objects.create(key='otherkey', secret=self.CONSUMER_SECRET, name='other.example.com')
+        self.CONSUMER_KEY = 'otherkey'
+        response = self._oauth_signed_get("/oauth/none/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_stacked_decorators_verify_once(self):
+        self.scope = Scope.objects.create(name="some")
+        self._request_token(scope=self.scope.name)
+        self._authorize_and_access_token_using_form()
+
+        nonces = Nonce.objects.count()
+        response = self._oauth_signed_get("/oauth/stacked/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Nonce.objects.count(), nonces + 1)
+
+    def test_oauth_request_is_parsed_once(self):
+        request = RequestFactory().get("/oauth/none/", {'oauth_consumer_key': self.CONSUMER_KEY})
+        oauth_request = get_oauth_request(request)
+        self.assertTrue(get_oauth_request(request) is oauth_request)
+        self.assertTrue(request.oauth.oauth_request is oauth_request)
+        self.assertFalse(request.oauth.verified)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import time
+
+import mock
+
+from django.test import TestCase
+
+from oauth_provider import metrics
+from oauth_provider.metrics import MetricsRegistry, registry, record_stage, OTHER_CONSUMERS
+from oauth_provider.signals import stage_timed
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+
+class MetricsRegistryTest(TestCase):
+    def test_render(self):
+        registry = MetricsRegistry(buckets=(.01, .1))
+        registry.inc('oauth_stage_outcomes_total', (('outcome', 'ok'), ('stage', 'parse')))
+        registry.inc('oauth_stage_outcomes_total', (('outcome', 'ok'), ('stage', 'parse')))
+        registry.observe('oauth_stage_duration_seconds', (('stage', 'parse'),), .05)
+        registry.observe('oauth_stage_duration_seconds', (('stage', 'parse'),), 1)
+        self.assertEqual(registry.render(), '\n'.join([
+            '# TYPE oauth_stage_outcomes_total counter',
+            'oauth_stage_outcomes_total{outcome="ok",stage="parse"} 2',
+            '# TYPE oauth_stage_duration_seconds histogram',
+            'oauth_stage_duration_seconds_bucket{stage="parse",le="0.01"} 0',
+            'oauth_stage_duration_seconds_bucket{stage="parse",le="0.1"} 1',
+            'oauth_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 2',
+            'oauth_stage_duration_seconds_sum{stage="parse"} 1.05',
+            'oauth_stage_duration_seconds_count{stage="parse"} 2',
+        ]) + '\n')
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.inc('total', (('consumer', 'a"b\\c\nd'),))
+        self.assertTrue('total{consumer="a\\"b\\\\c\\nd"} 1' in registry.render())
+
+    def test_consumers_are_bounded(self):
+        registry = MetricsRegistry(max_consumers=2)
+        self.assertEqual([registry.consumer_label(key) for key in ('a', 'b', 'c', 'a', '')],
+                         ['a', 'b', OTHER_CONSUMERS, 'a', ''])
+
+
+class MetricsRecordingTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(MetricsRecordingTest, self).setUp()
+        registry.clear()
+        stage_timed.connect(record_stage, dispatch_uid='oauth_provider.metrics.record_stage')
+        self.addCleanup(stage_timed.disconnect, dispatch_uid='oauth_provider.metrics.record_stage')
+
+    def _protected_get(self, nonce, signature=None):
+        parameters = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_version': '1.0',
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': nonce,
+            'oauth_signature': signature or '%s&%s' % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }
+        return self.c.get('/oauth/none/', parameters)
+
+    def _count(self, stage, outcome):
+        return registry.get('oauth_stage_outcomes_total', (
+            ('consumer', self.CONSUMER_KEY), ('endpoint', 'oauth_resource_None_scope'),
+            ('outcome', outcome), ('stage', stage)))
+
+    def test_outcomes_are_counted_by_reason(self):
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+
+        self.assertEqual(self._protected_get('first').status_code, 200)
+        self.assertEqual(self._protected_get('first').status_code, 401)
+        self._protected_get('second', signature='wrong&wrong')
+
+        self.assertEqual(self._count('check_signature', 'ok'), 2)
+        self.assertEqual(self._count('check_signature', 'signature'), 1)
+        self.assertEqual(self._count('check_nonce', 'ok'), 1)
+        self.assertEqual(self._count('check_nonce', 'nonce'), 1)
+        self.assertTrue('oauth_stage_duration_seconds_count{endpoint="oauth_resource_None_scope",'
+                        'stage="check_nonce"} 2' in registry.render())
+
+    def test_unknown_consumers_are_not_labelled(self):
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+        consumer_key = self.CONSUMER_KEY
+        with mock.patch.object(registry, 'max_consumers', 1):
+            for i in range(3):
+                self.CONSUMER_KEY = 'random%d' % i
+                self.assertEqual(self._protected_get('random%d' % i).status_code, 400)
+            self.CONSUMER_KEY = consumer_key
+            self.assertEqual(self._protected_get('first').status_code, 200)
+        self.assertEqual(self._count('check_nonce', 'ok'), 1)
+        self.assertEqual(registry.get('oauth_stage_outcomes_total', (
+            ('consumer', 'unknown'), ('endpoint', 'oauth_resource_None_scope'),
+            ('outcome', 'invalid_consumer'), ('stage', 'resolve'))), 3)
+        self.assertFalse('random' in registry.render())
+
+    def test_view(self):
+        registry.inc('oauth_stage_outcomes_total', (('stage', 'parse'),))
+        self.assertEqual(self.c.get('/oauth/metrics/').status_code, 403)
+        with mock.patch.object(metrics, 'METRICS_ALLOWED_IPS', ['127.0.0.1']):
+            response = self.c.get('/oauth/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertTrue('oauth_stage_outcomes_total{stage="parse"} 1' in response.content)
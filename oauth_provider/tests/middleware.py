@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import time
+
+import mock
+
+from django.test.utils import override_settings
+
+from oauth_provider import metrics, middleware
+from oauth_provider.models import Nonce, Token
+from oauth_provider.signals import stage_timed
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+MIDDLEWARE_CLASSES = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'oauth_provider.middleware.OAuthAuthenticationMiddleware',
+)
+
+
+@override_settings(MIDDLEWARE_CLASSES=MIDDLEWARE_CLASSES)
+class OAuthAuthenticationMiddlewareTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(OAuthAuthenticationMiddlewareTest, self).setUp()
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+        self.c.logout()
+
+    def _signed_get(self, url, nonce='nonce', signature=None):
+        parameters = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_version': '1.0',
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': nonce,
+            'oauth_signature': signature or '%s&%s' % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }
+        return self.c.get(url, parameters)
+
+    def test_user_of_access_token(self):
+        response = self._signed_get('/oauth/user/')
+        self.assertEqual(response.content, str(self.jane.pk))
+
+    def test_invalid_credentials_keep_user(self):
+        response = self._signed_get('/oauth/user/', signature='wrong&wrong')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, 'None')
+        self.c.login(username=self.username, password=self.password)
+        self.assertEqual(self.c.get('/oauth/user/').content, str(self.jane.pk))
+
+    def test_verified_lazily(self):
+        nonces = Nonce.objects.count()
+        with self.assertNumQueries(0):
+            response = self._signed_get('/oauth/metrics/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Nonce.objects.count(), nonces)
+
+    def test_decorated_view_is_verified_once(self):
+        nonces = Nonce.objects.count()
+        response = self._signed_get('/oauth/none/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Nonce.objects.count(), nonces + 1)
+
+    def test_with_metrics(self):
+        metrics.registry.clear()
+        stage_timed.connect(metrics.record_stage, dispatch_uid='oauth_provider.metrics.record_stage')
+        self.addCleanup(stage_timed.disconnect, dispatch_uid='oauth_provider.metrics.record_stage')
+
+        response = self._signed_get('/oauth/user/')
+        self.assertEqual(response.content, str(self.jane.pk))
+        self.assertEqual(metrics.registry.get('oauth_stage_outcomes_total', (
+            ('consumer', self.CONSUMER_KEY), ('endpoint', 'oauth_user'),
+            ('outcome', 'ok'), ('stage', 'check_nonce'))), 1)
+
+    def test_protected_prefixes(self):
+        with mock.patch.object(middleware, 'PROTECTED_PREFIXES', ('/oauth/user/',)):
+            self.assertEqual(self.c.get('/oauth/user/').status_code, 401)
+            self.assertEqual(self._signed_get('/oauth/user/', signature='wrong&wrong').status_code, 401)
+            self.assertEqual(self._signed_get('/oauth/user/').status_code, 200)
+            self.assertEqual(self.c.get('/oauth/none/').status_code, 401)
+            self.assertEqual(self.c.get('/oauth/metrics/').status_code, 403)
+
+    def test_scope_urls(self):
+        # self.scope is 'photos', for /oauth/photo/
+        with mock.patch.object(middleware, 'ENFORCE_SCOPE_URLS', True):
+            self.assertEqual(self.c.get('/oauth/photo/').status_code, 401)
+            response = self._signed_get('/oauth/photo/', nonce='1')
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.content, 'You are not allowed to access this resource.')
+            self.assertEqual(self._signed_get('/oauth/user/', nonce='2').status_code, 200)
+            Token.objects.filter(key=self.ACCESS_TOKEN_KEY).update(scopes=self.scope.mask)
+            self.assertEqual(self._signed_get('/oauth/photo/', nonce='3').status_code, 200)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import time
+
+import oauth2 as oauth
+
+from django.test import TestCase
+
+from oauth_provider.metrics import registry, record_stage
+from oauth_provider.models import Token
+from oauth_provider.parsing import parse_request, parse_authorization_header, OAuthRequest, escape,\
+    normalize_parameters
+from oauth_provider.signals import stage_timed
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+URL = 'http://testserver/resource/'
+HEADER = ('OAuth realm="", oauth_consumer_key="consumer%20key", oauth_token="tokenkey", '
+          'oauth_signature_method="HMAC-SHA1", oauth_signature="c2ln%2Bbg%3D%3D", '
+          'oauth_timestamp="1400000000", oauth_nonce="nonce", oauth_version="1.0", scope=photos')
+
+
+class ParseRequestTest(TestCase):
+    def assertSameAsOAuth2(self, method='GET', header=None, query_string='', form=None):
+        """Compare with `oauth2.Request.from_request` on the same input."""
+        expected = oauth.Request.from_request(
+            method, URL, headers={'Authorization': header} if header else None,
+            parameters=dict((k, v.encode('utf-8')) for k, v in (form or {}).items()),
+            query_string=query_string)
+        oauth_request = parse_request(method, URL, authorization=header,
+                                      query_string=query_string, form=form)
+        self.assertEqual(dict(oauth_request), dict(expected))
+        self.assertEqual(oauth_request.get_normalized_parameters(), expected.get_normalized_parameters())
+        self.assertEqual(oauth_request.normalized_url, expected.normalized_url)
+        return oauth_request
+
+    def test_header(self):
+        oauth_request = self.assertSameAsOAuth2(header=HEADER)
+        self.assertEqual(oauth_request['oauth_consumer_key'], u'consumer key')
+        self.assertEqual(oauth_request['oauth_signature'], u'c2ln+bg==')
+        self.assertFalse('realm' in oauth_request)
+
+    def test_query_string(self):
+        oauth_request = self.assertSameAsOAuth2(query_string='oauth_token=a+b&x=%C3%A9&empty&blank=')
+        self.assertEqual(oauth_request['oauth_token'], u'a b')
+        self.assertEqual(oauth_request['x'], u'\xe9')
+        self.assertEqual(oauth_request['empty'], u'')
+
+    def test_repeated_parameters(self):
+        query_string = 'oauth_token=b&oauth_token=a&x=%C3%A9&x=2'
+        expected = oauth.Request.from_request('GET', URL, query_string=query_string)
+        oauth_request = parse_request('GET', URL, query_string=query_string)
+        self.assertEqual(oauth_request['oauth_token'], u'b')
+        self.assertEqual(dict(oauth_request), {'oauth_token': u'b', 'x': u'\xe9'})
+        # every value is signed
+        self.assertEqual(oauth_request.get_normalized_parameters(), expected.get_normalized_parameters())
+
+    def test_precedence(self):
+        oauth_request = self.assertSameAsOAuth2(method='POST', header=HEADER,
+                                                query_string='oauth_nonce=fromquery',
+                                                form={u'oauth_nonce': u'fromform', u'oauth_token': u'fromform',
+                                                      u'body': u'\xe9t\xe9'})
+        self.assertEqual(oauth_request['oauth_nonce'], u'fromquery')
+        self.assertEqual(oauth_request['oauth_token'], u'tokenkey')
+        self.assertEqual(oauth_request['body'], u'\xe9t\xe9')
+
+    def test_no_parameters(self):
+        self.assertEqual(parse_request('GET', URL), None)
+        self.assertEqual(parse_request('GET', URL, authorization='Basic dXNlcjpwYXNz'), None)
+
+    def test_malformed_header(self):
+        self.assertRaises(oauth.Error, parse_authorization_header, 'OAuth oauth_token')
+
+    def test_values_are_decoded_lazily(self):
+        oauth_request = parse_request('GET', URL, authorization=HEADER)
+        self.assertEqual(len(oauth_request._params), 0)
+        oauth_request['oauth_token']
+        self.assertEqual(oauth_request._params.keys(), ['oauth_token'])
+        self.assertEqual(len(oauth_request), 8)
+
+    def test_oauth2_api(self):
+        oauth_request = parse_request('get', 'https://testserver:443/resource/', authorization=HEADER)
+        self.assertEqual(oauth_request.method, 'GET')
+        self.assertEqual(oauth_request.normalized_url, 'https://testserver/resource/')
+        self.assertEqual(oauth_request.get('missing', 'default'), 'default')
+        self.assertRaises(KeyError, oauth_request.__getitem__, 'missing')
+        self.assertRaises(oauth.Error, oauth_request.get_parameter, 'missing')
+        self.assertEqual(oauth_request.get_nonoauth_parameters(), {'scope': u'photos'})
+        self.assertEqual(oauth_request._get_timestamp_nonce(), (u'1400000000', u'nonce'))
+        oauth_request['oauth_token'] = u'other'
+        self.assertEqual(oauth_request['oauth_token'], u'other')
+        self.assertFalse(hasattr(oauth_request, '__dict__'))
+        self.assertTrue(isinstance(oauth_request, OAuthRequest))
+
+    def test_verified_by_oauth2_server(self):
+        consumer = oauth.Consumer('consumerkey', 'consumersecret')
+        signed = oauth.Request.from_consumer_and_token(consumer, None, http_method='GET', http_url=URL,
+                                                       parameters={'scope': 'photos'})
+        signed.sign_request(oauth.SignatureMethod_HMAC_SHA1(), consumer, None)
+        oauth_request = parse_request('GET', URL, authorization=signed.to_header()['Authorization'],
+                                      query_string='scope=photos')
+        server = oauth.Server({'HMAC-SHA1': oauth.SignatureMethod_HMAC_SHA1()})
+        self.assertEqual(server.verify_request(oauth_request, consumer, None), {'scope': u'photos'})
+
+
+class NormalizationTest(TestCase):
+    def test_escape_matches_oauth2(self):
+        for i in range(256):
+            self.assertEqual(escape(chr(i)), oauth.escape(chr(i)))
+        for value in ('', 'plain-value_1.0~', 'a b+c/d?e=f&g', u'\xe9t\xe9 \u20ac', '%41'):
+            self.assertEqual(escape(value), oauth.escape(value))
+
+    def test_normalize_matches_oauth2(self):
+        params = {
+            u'oauth_consumer_key': u'key', 'oauth_signature': u'left out', u'b': u'~*+ /',
+            u'a': [u'z', u'\xe9', u'', u'a b'], u'a b': u'1', u'\xe9': u'\u20ac', u'n': 7, u'empty': u'',
+        }
+        expected = oauth.Request('GET', URL, params).get_normalized_parameters()
+        self.assertEqual(normalize_parameters(params), expected)
+        self.assertTrue(isinstance(normalize_parameters(params), str))
+        self.assertEqual(normalize_parameters({}), '')
+
+
+class RepeatedParametersTest(BaseOAuthTestCase):
+    """Parameters given several times are read as their first value."""
+    def _request_token_response(self, **parameters):
+        defaults = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_signature': '%s&' % self.CONSUMER_SECRET,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': 'requestnonce',
+            'oauth_version': '1.0',
+            'oauth_callback': self.callback,
+        }
+        defaults.update(parameters)
+        return self.c.get('/oauth/request_token/', defaults)
+
+    def test_timestamp(self):
+        now = str(int(time.time()))
+        self.assertEqual(self._request_token_response(oauth_timestamp=[now, '1']).status_code, 200)
+        self.assertEqual(self._request_token_response(oauth_timestamp=['1', now], oauth_nonce='2').status_code, 401)
+
+    def test_signature_method(self):
+        response = self._request_token_response(oauth_signature_method=['PLAINTEXT', 'HMAC-SHA1'])
+        self.assertEqual(response.status_code, 200)
+        response = self._request_token_response(oauth_signature_method=['RSA-MD5', 'PLAINTEXT'], oauth_nonce='2')
+        self.assertEqual(response.status_code, 401)
+
+    def test_consumer_key(self):
+        response = self._request_token_response(oauth_consumer_key=[self.CONSUMER_KEY, 'other'])
+        self.assertEqual(response.status_code, 200)
+        response = self._request_token_response(oauth_consumer_key=['other', self.CONSUMER_KEY], oauth_nonce='2')
+        self.assertEqual(response.status_code, 400)
+
+    def test_scope(self):
+        response = self._request_token_response(scope=[self.scope.name, 'unknown'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Token.objects.get().scope, self.scope)
+
+    def test_metrics(self):
+        registry.clear()
+        stage_timed.connect(record_stage, dispatch_uid='oauth_provider.metrics.record_stage')
+        self.addCleanup(stage_timed.disconnect, dispatch_uid='oauth_provider.metrics.record_stage')
+        response = self._request_token_response(oauth_consumer_key=[self.CONSUMER_KEY, 'other'])
+        self.assertEqual(response.status_code, 200)
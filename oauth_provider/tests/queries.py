@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Query budgets of every OAuth flow, for each shipped store.
+
+The budgets are a contract: a change adding a query to a flow must update
+them here and in the README. They are counted in a `TestCase`, so the
+savepoint around each nonce insert counts as two statements.
+"""
+import time
+from urlparse import parse_qs, urlparse
+
+import mock
+
+from oauth_provider import decorators, views
+from oauth_provider import store as store_package
+from oauth_provider.caching import get_oauth_cache
+from oauth_provider.models import Token
+from oauth_provider.store.cache import CachedModelStore
+from oauth_provider.store.db import ModelStore
+from oauth_provider.store.nonce import CacheNonceStore
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+
+class ModelStoreQueryBudgetTest(BaseOAuthTestCase):
+    store_class = ModelStore
+    budgets = {
+        'request_token': 13,
+        'authorize_get': 7,
+        'authorize_post': 8,
+        'access_token': 14,
+        'xauth': 21,
+        'protected_resource': 4,
+        'protected_resource_cache_nonces': 1,
+    }
+
+    def setUp(self):
+        super(ModelStoreQueryBudgetTest, self).setUp()
+        get_oauth_cache().clear()
+        self.store = self.store_class()
+        for module in (views, decorators, store_package):
+            patcher = mock.patch.object(module, 'store', self.store)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # budgets are for a steady state, with the consumer already looked up
+        self.store.get_consumer(None, None, self.CONSUMER_KEY)
+        self.nonce = 0
+
+    def _signed_get(self, path, token_secret='', **parameters):
+        self.nonce += 1
+        parameters.update({
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_signature': '%s&%s' % (self.CONSUMER_SECRET, token_secret),
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': 'nonce%d' % self.nonce,
+            'oauth_version': '1.0',
+        })
+        return self.c.get(path, parameters)
+
+    def _get_request_token(self):
+        response = self._signed_get('/oauth/request_token/', oauth_callback=self.callback, scope=self.scope.name)
+        self.assertEqual(response.status_code, 200)
+        return Token.objects.get(key=parse_qs(response.content)['oauth_token'][0])
+
+    def _authorize(self, token):
+        self.c.login(username=self.username, password=self.password)
+        self.c.get('/oauth/authorize/', {'oauth_token': token.key})
+        response = self.c.post('/oauth/authorize/', {'oauth_token': token.key, 'authorize_access': 1})
+        self.c.logout()
+        return parse_qs(urlparse(response['Location']).query)['oauth_verifier'][0]
+
+    def _get_access_token(self):
+        request_token = self._get_request_token()
+        verifier = self._authorize(request_token)
+        response = self._signed_get('/oauth/access_token/', request_token.secret,
+                                    oauth_token=request_token.key, oauth_verifier=verifier)
+        self.assertEqual(response.status_code, 200)
+        return Token.objects.get(key=parse_qs(response.content)['oauth_token'][0])
+
+    def test_request_token(self):
+        with self.assertNumQueries(self.budgets['request_token']):
+            response = self._signed_get('/oauth/request_token/', oauth_callback=self.callback,
+                                        scope=self.scope.name)
+        self.assertEqual(response.status_code, 200)
+
+    def test_authorize(self):
+        token = self._get_request_token()
+        self.c.login(username=self.username, password=self.password)
+        with self.assertNumQueries(self.budgets['authorize_get']):
+            response = self.c.get('/oauth/authorize/', {'oauth_token': token.key})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(self.budgets['authorize_post']):
+            response = self.c.post('/oauth/authorize/', {'oauth_token': token.key, 'authorize_access': 1})
+        self.assertEqual(response.status_code, 302)
+
+    def test_access_token(self):
+        request_token = self._get_request_token()
+        verifier = self._authorize(request_token)
+        with self.assertNumQueries(self.budgets['access_token']):
+            response = self._signed_get('/oauth/access_token/', request_token.secret,
+                                        oauth_token=request_token.key, oauth_verifier=verifier)
+        self.assertEqual(response.status_code, 200)
+
+    def test_xauth(self):
+        self.consumer.xauth_allowed = True
+        self.consumer.save()
+        self.store.get_consumer(None, None, self.CONSUMER_KEY)
+        with self.assertNumQueries(self.budgets['xauth']):
+            response = self._signed_get('/oauth/access_token/', x_auth_mode='client_auth',
+                                        x_auth_username=self.username, x_auth_password=self.password)
+        self.assertEqual(response.status_code, 200)
+
+    def test_protected_resource(self):
+        token = self._get_access_token()
+        self._signed_get('/oauth/photo/', token.secret, oauth_token=token.key)
+        with self.assertNumQueries(self.budgets['protected_resource']):
+            response = self._signed_get('/oauth/photo/', token.secret, oauth_token=token.key)
+        self.assertEqual(response.status_code, 200)
+
+    def test_protected_resource_cache_nonces(self):
+        token = self._get_access_token()
+        self._signed_get('/oauth/photo/', token.secret, oauth_token=token.key)
+        with mock.patch('oauth_provider.store.db.nonce_store', CacheNonceStore()):
+            with self.assertNumQueries(self.budgets['protected_resource_cache_nonces']):
+                response = self._signed_get('/oauth/photo/', token.secret, oauth_token=token.key)
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedModelStoreQueryBudgetTest(ModelStoreQueryBudgetTest):
+    store_class = CachedModelStore
+    budgets = {
+        'request_token': 12,
+        'authorize_get': 7,
+        'authorize_post': 8,
+        'access_token': 13,
+        'xauth': 20,
+        'protected_resource': 3,
+        'protected_resource_cache_nonces': 0,
+    }
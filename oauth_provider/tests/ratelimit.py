@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import time
+
+import mock
+
+from django.test import TestCase
+
+from oauth_provider import caching, ratelimit
+from oauth_provider.caching import get_oauth_cache
+from oauth_provider.models import Consumer, Scope
+from oauth_provider.ratelimit import consume, get_consumer_rate_limit
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+
+class ConsumeTest(TestCase):
+    def setUp(self):
+        get_oauth_cache().clear()
+
+    def test_limit_per_window(self):
+        now = 6000.0
+        self.assertEqual([consume('test', 'key', 3, 60, now) for i in range(3)], [None] * 3)
+        self.assertEqual(consume('test', 'key', 3, 60, now + 10), 50)
+        # other keys have their own bucket
+        self.assertEqual(consume('test', 'other', 3, 60, now), None)
+
+    def test_previous_window_is_weighted(self):
+        now = 6000.0
+        for i in range(4):
+            consume('test', 'key', 4, 60, now)
+        # 3/4 of the previous window still count: 3 + 1 <= 4, then 3 + 2 > 4
+        self.assertEqual(consume('test', 'key', 4, 60, now + 75), None)
+        self.assertEqual(consume('test', 'key', 4, 60, now + 75), 45)
+        # a window later, the first one no longer counts
+        self.assertEqual(consume('test', 'key', 4, 60, now + 125), None)
+
+
+class RateLimitTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(RateLimitTest, self).setUp()
+        get_oauth_cache().clear()
+        patcher = mock.patch.multiple(ratelimit, RATE_LIMIT_ENABLED=True, CONSUMER_RATE_LIMIT=2,
+                                      IP_RATE_LIMIT=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request_token_response(self, nonce):
+        parameters = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_signature': '%s&' % self.CONSUMER_SECRET,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': nonce,
+            'oauth_version': '1.0',
+            'oauth_callback': self.callback,
+        }
+        return self.c.get('/oauth/request_token/', parameters)
+
+    def test_consumer_limit(self):
+        self.assertEqual(self._request_token_response('1').status_code, 200)
+        self.assertEqual(self._request_token_response('2').status_code, 200)
+        response = self._request_token_response('3')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) >= 1)
+
+    def test_limit_of_consumer(self):
+        self.consumer.rate_limit = 1
+        self.consumer.save()
+        self.assertEqual(get_consumer_rate_limit(self.CONSUMER_KEY), 1)
+        self.assertEqual(self._request_token_response('1').status_code, 200)
+        self.assertEqual(self._request_token_response('2').status_code, 429)
+
+    def test_ip_limit(self):
+        with mock.patch.object(ratelimit, 'IP_RATE_LIMIT', 1):
+            self.assertEqual(self._request_token_response('1').status_code, 200)
+            self.assertEqual(self._request_token_response('2').status_code, 429)
+
+    def test_limited_before_database_access(self):
+        self._request_token_response('1')
+        self._request_token_response('2')
+        with self.assertNumQueries(0):
+            self.assertEqual(self._request_token_response('3').status_code, 429)
+
+    def test_unknown_consumer_is_looked_up_once(self):
+        caching.unknown_consumers.clear()
+        self.CONSUMER_KEY = 'unknownkey'
+        with self.assertNumQueries(1):
+            self.assertEqual(self._request_token_response('1').status_code, 400)
+        self.assertTrue(caching.is_unknown_consumer('unknownkey'))
+        with self.assertNumQueries(0):
+            self._request_token_response('2')
+
+    def test_protected_resource(self):
+        self.scope = Scope.objects.create(name='some')
+        self._request_token(scope=self.scope.name)
+        self._authorize_and_access_token_using_form()
+        get_oauth_cache().clear()
+        parameters = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_version': '1.0',
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_signature': '%s&%s' % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }
+        statuses = []
+        for nonce in ('1', '2', '3'):
+            parameters.update(oauth_nonce=nonce, oauth_timestamp=str(int(time.time())))
+            statuses.append(self.c.get('/oauth/stacked/', parameters).status_code)
+        # stacked decorators count a request once
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_saving_consumer_invalidates_limit(self):
+        self.assertEqual(get_consumer_rate_limit(self.CONSUMER_KEY), 2)
+        Consumer.objects.filter(pk=self.consumer.pk).update(rate_limit=5)
+        self.assertEqual(get_consumer_rate_limit(self.CONSUMER_KEY), 2)
+        self.consumer.rate_limit = 10
+        self.consumer.save()
+        self.assertEqual(get_consumer_rate_limit(self.CONSUMER_KEY), 10)
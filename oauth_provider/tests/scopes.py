@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+try:
+    from unittest import skipIf
+except ImportError:
+    from django.utils.unittest import skipIf
+
+import django
+import mock
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, TransactionTestCase
+
+from oauth_provider import models
+from oauth_provider.caching import get_oauth_cache, access_token_cache_key
+from oauth_provider.decorators import CheckOauth
+from oauth_provider.compat import atomic
+from oauth_provider.models import Scope, Token
+from oauth_provider.scopes import ScopeRegistry, registry, SCOPES_VERSION_CACHE_KEY
+from oauth_provider.store.cache import CachedModelStore
+from oauth_provider.tests.auth import BaseOAuthTestCase, commit_scope_changes_at_once
+
+
+class ScopeRegistryTest(TestCase):
+    def setUp(self):
+        commit_scope_changes_at_once(self)
+        get_oauth_cache().clear()
+        registry.clear()
+        self.photos = Scope.objects.create(name='photos', url='/photos/', is_readonly=False)
+        self.videos = Scope.objects.create(name='videos', url='/videos/')
+
+    def test_lookups(self):
+        self.assertEqual(registry.get_by_name('photos'), self.photos)
+        self.assertEqual(registry.get_by_name('unknown'), None)
+        self.assertEqual(registry.get(self.videos.pk), self.videos)
+        self.assertFalse(registry.is_readonly(self.photos.pk))
+        self.assertTrue(registry.is_readonly(self.videos.pk))
+
+    def test_loaded_once(self):
+        registry.get_by_name('photos')
+        with self.assertNumQueries(0):
+            registry.mask('photos')
+            registry.get_by_name('videos')
+
+    def test_saving_scope_reloads(self):
+        registry.mask('photos')
+        other = Scope.objects.create(name='photos', url='/other/')
+        self.assertEqual(registry.mask('photos'), self.photos.mask | other.mask)
+        self.assertEqual(registry.get_by_name('photos'), self.photos)
+        other.delete()
+        self.assertEqual(registry.mask('photos'), self.photos.mask)
+
+    def test_version_is_checked_after_interval(self):
+        scopes = ScopeRegistry(check_interval=10)
+        with mock.patch('time.time', return_value=1000.0):
+            scopes.mask('photos')
+        # changed by another process
+        Scope.objects.filter(pk=self.photos.pk).update(name='pictures')
+        get_oauth_cache().set(SCOPES_VERSION_CACHE_KEY, 'changed')
+        with mock.patch('time.time', return_value=1005.0):
+            self.assertEqual(scopes.mask('pictures'), 0)
+        with mock.patch('time.time', return_value=1010.0):
+            self.assertEqual(scopes.mask('pictures'), self.photos.mask)
+
+
+@skipIf(django.VERSION < (1, 9), 'transaction.on_commit requires Django 1.9')
+class ScopeCommitTest(TransactionTestCase):
+    def setUp(self):
+        get_oauth_cache().clear()
+        registry.clear()
+        self.photos = Scope.objects.create(name='photos', url='/photos/')
+
+    def test_registry_is_reloaded_after_commit(self):
+        self.assertEqual(registry.get_by_name('videos'), None)
+        version = get_oauth_cache().get(SCOPES_VERSION_CACHE_KEY)
+        with atomic():
+            Scope.objects.create(name='videos', url='/videos/')
+            # another process reloading now would keep the old scopes
+            self.assertEqual(get_oauth_cache().get(SCOPES_VERSION_CACHE_KEY), version)
+            self.assertEqual(registry.get_by_name('videos'), None)
+        self.assertNotEqual(get_oauth_cache().get(SCOPES_VERSION_CACHE_KEY), version)
+        self.assertEqual(registry.get_by_name('videos').name, 'videos')
+
+    def test_rolled_back_change_is_ignored(self):
+        version = get_oauth_cache().get(SCOPES_VERSION_CACHE_KEY)
+        try:
+            with atomic():
+                Scope.objects.create(name='videos', url='/videos/')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(get_oauth_cache().get(SCOPES_VERSION_CACHE_KEY), version)
+        self.assertEqual(registry.get_by_name('videos'), None)
+
+    def test_reused_bit_is_granted_after_commit(self):
+        consumer = models.Consumer.objects.create(name='example', key='consumerkey', secret='secret')
+        token = Token.objects.create_token(consumer=consumer, token_type=Token.ACCESS, timestamp=0,
+                                           scope=None, scopes=self.photos.mask)
+        store = CachedModelStore()
+        get_token = lambda: store.get_access_token(None, None, consumer, token.key)
+        get_token()
+        self.photos.delete()
+        cache_key = access_token_cache_key(token.key)
+        with atomic():
+            music = Scope.objects.create(name='music', url='/music/')
+            self.assertEqual(music.mask, self.photos.mask)
+            # tokens cached by other processes before the commit still have
+            # the bit, under the old version
+            self.assertEqual(access_token_cache_key(token.key), cache_key)
+            self.assertFalse(CheckOauth('music').has_scopes(get_token()))
+        self.assertNotEqual(access_token_cache_key(token.key), cache_key)
+        self.assertEqual(get_token().scopes, 0)
+        self.assertFalse(CheckOauth('music').has_scopes(get_token()))
+
+
+class ScopeBitsTest(TestCase):
+    def setUp(self):
+        commit_scope_changes_at_once(self)
+        get_oauth_cache().clear()
+        registry.clear()
+        self.photos = Scope.objects.create(name='photos', url='/photos/')
+        self.videos = Scope.objects.create(name='videos', url='/videos/')
+        self.consumer = models.Consumer.objects.create(name='example', key='consumerkey', secret='secret')
+        self.token = Token.objects.create_token(consumer=self.consumer, token_type=Token.ACCESS, timestamp=0,
+                                                scope=self.videos, scopes=self.photos.mask)
+
+    def test_bits_are_assigned(self):
+        self.assertEqual((self.photos.bit, self.videos.bit), (0, 1))
+        self.assertEqual(registry.mask('photos', 'videos', 'unknown'), 3)
+
+    def test_deleted_bit_is_released(self):
+        self.photos.delete()
+        self.assertEqual(Scope.objects.create(name='music', url='/music/').bit, 0)
+
+    def test_reused_bit_is_cleared_from_tokens(self):
+        self.assertEqual(self.token.scopes, self.photos.mask | self.videos.mask)
+        self.photos.delete()
+        # left alone until the bit is reused, as no scope has it
+        self.assertEqual(Token.objects.get(pk=self.token.pk).scopes, self.photos.mask | self.videos.mask)
+        Scope.objects.create(name='music', url='/music/')
+        self.assertEqual(Token.objects.get(pk=self.token.pk).scopes, self.videos.mask)
+
+    def test_reused_bit_is_cleared_from_cached_tokens(self):
+        store = CachedModelStore()
+        get_token = lambda: store.get_access_token(None, None, self.consumer, self.token.key)
+        self.assertEqual(get_token().scopes, self.photos.mask | self.videos.mask)
+        self.photos.delete()
+        music = Scope.objects.create(name='music', url='/music/')
+        self.assertEqual(music.mask, self.photos.mask)
+        self.assertEqual(get_token().scopes, self.videos.mask)
+        self.assertFalse(CheckOauth('music').has_scopes(get_token()))
+
+    def test_number_of_scopes_is_limited(self):
+        with mock.patch.object(models, 'MAX_SCOPES', 2):
+            self.assertRaises(ValidationError, Scope.objects.create, name='music', url='/music/')
+
+
+class MultiScopeTokenTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(MultiScopeTokenTest, self).setUp()
+        registry.clear()
+        self.videos = Scope.objects.create(name='videos', url='/videos/')
+
+    def test_token_with_several_scopes(self):
+        self._request_token(scope='photos videos')
+        self.assertEqual(self.request_token.scope, self.scope)
+        self.assertEqual(self.request_token.scopes, self.scope.mask | self.videos.mask)
+        self._authorize_and_access_token_using_form()
+        access_token = Token.objects.get(key=self.ACCESS_TOKEN_KEY)
+        self.assertEqual(access_token.get_scopes(), [self.scope, self.videos])
+
+    def test_unknown_scope(self):
+        self.assertEqual(registry.get_all_by_names('photos unknown'), None)
+        self.assertEqual(registry.get_all_by_names(''), None)
+
+    def test_any_of_and_all_of(self):
+        music = Scope.objects.create(name='music', url='/music/')
+        token = Token(scopes=self.scope.mask | self.videos.mask)
+        self.assertTrue(CheckOauth('videos').has_scopes(token))
+        self.assertFalse(CheckOauth('music').has_scopes(token))
+        self.assertTrue(CheckOauth(any_of=('music', 'photos')).has_scopes(token))
+        self.assertFalse(CheckOauth(any_of=('music', 'unknown')).has_scopes(token))
+        self.assertTrue(CheckOauth(all_of=('photos', 'videos')).has_scopes(token))
+        self.assertFalse(CheckOauth(all_of=('photos', 'music')).has_scopes(token))
+        self.assertTrue(CheckOauth('photos', any_of=('music', 'videos')).has_scopes(token))
+        self.assertTrue(CheckOauth().has_scopes(Token()))
+        self.assertEqual(music.mask, 4)
+
+
+class ScopeHierarchyTest(TestCase):
+    def setUp(self):
+        commit_scope_changes_at_once(self)
+        registry.clear()
+        self.photos = Scope.objects.create(name='photos', url='/photos/')
+        self.read = Scope.objects.create(name='photos:read', url='/photos/', parent=self.photos)
+        self.thumbnails = Scope.objects.create(name='photos:read:thumbnails', url='/photos/', parent=self.read)
+
+    def test_ancestors_imply_scope(self):
+        check = CheckOauth('photos:read:thumbnails')
+        self.assertTrue(check.has_scopes(Token(scopes=self.photos.mask)))
+        self.assertTrue(check.has_scopes(Token(scopes=self.read.mask)))
+        self.assertFalse(CheckOauth('photos').has_scopes(Token(scopes=self.read.mask)))
+        self.assertFalse(CheckOauth(all_of=('photos:read', 'photos')).has_scopes(Token(scopes=self.thumbnails.mask)))
+
+    def test_checks_need_no_query(self):
+        registry.mask('photos')
+        with self.assertNumQueries(0):
+            CheckOauth('photos:read').has_scopes(Token(scopes=self.photos.mask))
+
+    def test_changing_parent_rebuilds(self):
+        self.assertTrue(CheckOauth('photos:read').has_scopes(Token(scopes=self.photos.mask)))
+        self.read.parent = None
+        self.read.save()
+        self.assertFalse(CheckOauth('photos:read').has_scopes(Token(scopes=self.photos.mask)))
+        self.assertTrue(CheckOauth('photos:read:thumbnails').has_scopes(Token(scopes=self.read.mask)))
+
+    def test_cycles_are_rejected(self):
+        self.photos.parent = self.thumbnails
+        self.assertRaises(ValidationError, self.photos.clean)
+        # and ignored if saved anyway
+        self.photos.save()
+        self.assertEqual(registry.mask('photos'), self.photos.mask | self.read.mask | self.thumbnails.mask)
+
+
+class ScopeUrlIndexTest(TestCase):
+    def setUp(self):
+        commit_scope_changes_at_once(self)
+        registry.clear()
+        self.photos = Scope.objects.create(name='photos', url='/api/photos/')
+        self.private = Scope.objects.create(name='photos:private', url='/api/photos/private/', parent=self.photos)
+        self.videos = Scope.objects.create(name='videos', url='http://example.com/api/videos')
+        Scope.objects.create(name='all', url='')
+
+    def test_longest_url_is_required(self):
+        self.assertEqual(registry.url_mask('/api/photos/1'), self.photos.mask)
+        self.assertEqual(registry.url_mask('/api/photos/private/1'), self.private.mask | self.photos.mask)
+        self.assertEqual(registry.url_mask('/api/videos'), self.videos.mask)
+        self.assertEqual(registry.url_mask('/api/videos/1'), self.videos.mask)
+        self.assertEqual(registry.url_mask('/api/videosecret'), 0)
+        self.assertEqual(registry.url_mask('/api/'), 0)
+
+    def test_scopes_with_same_url(self):
+        thumbnails = Scope.objects.create(name='thumbnails', url='/api/photos/')
+        self.assertEqual(registry.url_mask('/api/photos/1'), self.photos.mask | thumbnails.mask)
+
+    def test_index_follows_changes(self):
+        self.assertEqual(registry.url_mask('/api/music/'), 0)
+        self.videos.url = '/api/music/'
+        self.videos.save()
+        self.assertEqual(registry.url_mask('/api/music/1'), self.videos.mask)
+        self.assertEqual(registry.url_mask('/api/videos'), 0)
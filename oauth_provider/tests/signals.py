@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.test.client import RequestFactory
+
+from oauth_provider.signals import stage_timed, timed
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+
+class StageTimedTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(StageTimedTest, self).setUp()
+        self.events = []
+        stage_timed.connect(self.receiver, dispatch_uid='stage_timed_test')
+        self.addCleanup(stage_timed.disconnect, dispatch_uid='stage_timed_test')
+
+    def receiver(self, sender, request, stage, duration, outcome, **kwargs):
+        self.assertTrue(duration >= 0)
+        self.events.append((stage, outcome))
+
+    def _protected_get(self, signature=None, consumer_key=None):
+        parameters = {
+            'oauth_consumer_key': consumer_key or self.CONSUMER_KEY,
+            'oauth_signature_method': 'PLAINTEXT',
+            'oauth_version': '1.0',
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': str(time.time()) + 'nonce',
+            'oauth_signature': signature or '%s&%s' % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }
+        return self.c.get('/oauth/none/', parameters)
+
+    def test_stages_of_protected_request(self):
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+        self.events = []
+
+        self.assertEqual(self._protected_get().status_code, 200)
+        self.assertEqual(self.events, [('parse', 'ok'), ('check_parameters', 'ok'), ('check_timestamp', 'ok'),
+                                       ('resolve', 'ok'), ('check_signature', 'ok'), ('check_nonce', 'ok')])
+
+    def test_rejections_are_reported(self):
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+        self.events = []
+
+        self.assertEqual(self._protected_get(signature='wrong&wrong').status_code, 401)
+        self.assertEqual(self.events[-1], ('check_signature', 'signature'))
+        self._protected_get(consumer_key='unknown')
+        self.assertEqual(self.events[-1], ('resolve', 'invalid_consumer'))
+
+    def test_no_timing_without_receivers(self):
+        stage_timed.disconnect(dispatch_uid='stage_timed_test')
+        request = RequestFactory().get('/')
+        self.assertTrue(timed(request, 'parse') is timed(request, 'resolve'))
+        with timed(request, 'parse') as timer:
+            timer.fail('missing')
+        self.assertEqual(self.events, [])
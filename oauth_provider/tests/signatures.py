@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import binascii
+try:
+    from unittest import skipIf
+except ImportError:
+    from django.utils.unittest import skipIf
+
+import oauth2 as oauth
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from oauth_provider import utils
+from oauth_provider.models import Consumer
+from oauth_provider.signatures import engine, get_engine, credentials, Credentials, signature_base_string,\
+    SignatureMethod_HMAC_SHA1, SignatureMethod_HMAC_SHA256
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
+except ImportError:
+    rsa = None
+
+
+class SignatureEngineTest(TestCase):
+    def setUp(self):
+        self.consumer = oauth.Consumer('consumerkey', 'consumersecret')
+        self.token = oauth.Token('tokenkey', 'tokensecret')
+
+    def _signed_request(self, signature_method, **parameters):
+        request = oauth.Request.from_consumer_and_token(self.consumer, self.token, http_method='GET',
+                                                        http_url='http://testserver/resource/',
+                                                        parameters=parameters)
+        request.sign_request(signature_method, self.consumer, self.token)
+        return request
+
+    def test_verify(self):
+        consumer = Credentials('consumerkey', 'consumersecret')
+        token = Credentials('tokenkey', 'tokensecret')
+        for signature_method in (oauth.SignatureMethod_PLAINTEXT(), oauth.SignatureMethod_HMAC_SHA1()):
+            request = self._signed_request(signature_method, foo='bar')
+            engine.verify(request, consumer, token)
+            self.assertRaises(oauth.Error, engine.verify, request, consumer, Credentials('tokenkey', 'other'))
+
+        # only HMAC-SHA1, the last method above, signs the parameters
+        request['foo'] = 'baz'
+        self.assertRaises(oauth.Error, engine.verify, request, consumer, token)
+
+    def test_registry(self):
+        self.assertEqual(sorted(engine.methods), ['HMAC-SHA1', 'PLAINTEXT'])
+        hmac_only = get_engine(['hmac-sha1'])
+        request = self._signed_request(oauth.SignatureMethod_PLAINTEXT())
+        self.assertRaises(oauth.Error, hmac_only.verify, request, self.consumer, self.token)
+        self.assertRaises(ImproperlyConfigured, get_engine, ['rsa-md5'])
+
+    def test_credentials_are_memoized(self):
+        consumer = Consumer(key=u'consumerkey', secret=u'secret')
+        record = credentials(consumer)
+        self.assertEqual(record, Credentials('consumerkey', 'secret'))
+        self.assertTrue(isinstance(record.secret, str))
+        self.assertTrue(credentials(consumer) is record)
+
+        consumer.secret = u'rotated'
+        self.assertEqual(credentials(consumer).secret, 'rotated')
+        self.assertEqual(credentials(None), None)
+
+    def test_initialize_server_request_shares_server(self):
+        request = RequestFactory().get('/resource/', {'oauth_consumer_key': 'consumerkey'})
+        server, oauth_request = utils.initialize_server_request(request)
+        self.assertTrue(utils.initialize_server_request(request)[0] is server)
+        self.assertEqual(sorted(server.signature_methods), ['HMAC-SHA1', 'PLAINTEXT'])
+
+    def test_hmac_sha1_matches_oauth2(self):
+        request = self._signed_request(oauth.SignatureMethod_HMAC_SHA1(), foo=u'b\xe4r baz', empty='')
+        for token in (self.token, None):
+            self.assertEqual(SignatureMethod_HMAC_SHA1().signing_base(request, self.consumer, token),
+                             oauth.SignatureMethod_HMAC_SHA1().signing_base(request, self.consumer, token))
+        self.assertTrue(isinstance(signature_base_string(request), str))
+
+    def test_hmac_sha256(self):
+        engine = get_engine(['hmac-sha256'])
+        request = self._signed_request(SignatureMethod_HMAC_SHA256(), foo='bar')
+        self.assertEqual(len(binascii.a2b_base64(request['oauth_signature'])), 32)
+        engine.verify(request, self.consumer, self.token)
+
+        request['foo'] = 'baz'
+        self.assertRaises(oauth.Error, engine.verify, request, self.consumer, self.token)
+
+    @skipIf(rsa is None, 'cryptography is not installed')
+    def test_rsa_sha1(self):
+        private_key = rsa.generate_private_key(65537, 1024, default_backend())
+        public_key = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode('ascii')
+        consumer = Credentials('consumerkey', '', public_key)
+        engine = get_engine(['rsa-sha1'])
+
+        request = oauth.Request.from_consumer_and_token(self.consumer, self.token, http_method='GET',
+                                                        http_url='http://testserver/resource/',
+                                                        parameters={'foo': 'bar'})
+        request['oauth_signature_method'] = 'RSA-SHA1'
+        signature = private_key.sign(signature_base_string(request), padding.PKCS1v15(), hashes.SHA1())
+        request['oauth_signature'] = binascii.b2a_base64(signature)[:-1]
+        engine.verify(request, consumer, self.token)
+
+        self.assertRaises(oauth.Error, engine.verify, request, Credentials('consumerkey', ''), self.token)
+        request['foo'] = 'baz'
+        self.assertRaises(oauth.Error, engine.verify, request, consumer, self.token)
+
+    @skipIf(rsa is None, 'cryptography is not installed')
+    def test_consumer_validates_rsa_public_key(self):
+        consumer = Consumer(name='example', key='consumerkey', rsa_public_key='garbage')
+        self.assertRaises(ValidationError, consumer.clean)
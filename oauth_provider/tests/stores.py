@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import time
+
+import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from oauth_provider import caching
+from oauth_provider.caching import get_oauth_cache, NegativeCache, BloomFilter, ConsumerKeyFilter
+from oauth_provider.models import Consumer, Token, Nonce, nonce_digest
+from oauth_provider.store import InvalidConsumerError, InvalidTokenError
+from oauth_provider.store.cache import CachedModelStore
+from oauth_provider.store.db import ModelStore
+from oauth_provider.store.nonce import ModelNonceStore, CacheNonceStore
+
+
+class ModelStoreTest(TestCase):
+    store_class = ModelStore
+
+    def setUp(self):
+        get_oauth_cache().clear()
+        caching.unknown_consumers.clear()
+        caching.unknown_access_tokens.clear()
+        self.store = self.store_class()
+        self.consumer = Consumer.objects.create(name='example', key='consumerkey', secret='secret')
+        self.token = Token.objects.create_token(consumer=self.consumer, token_type=Token.ACCESS,
+                                                timestamp=0, scope=None)
+        self.other_consumer = Consumer.objects.create(name='other', key='otherkey', secret='secret')
+
+    def test_consumer_and_access_token_in_one_query(self):
+        with self.assertNumQueries(1):
+            consumer, token = self.store.get_consumer_and_access_token(None, None, 'consumerkey', self.token.key)
+            token.consumer, token.scope, token.user
+        self.assertEqual(consumer, self.consumer)
+        self.assertEqual(token, self.token)
+
+    def test_access_token_must_belong_to_consumer(self):
+        self.assertRaises(InvalidTokenError, self.store.get_access_token,
+                          None, None, self.other_consumer, self.token.key)
+        self.assertRaises(InvalidTokenError, self.store.get_consumer_and_access_token,
+                          None, None, 'otherkey', self.token.key)
+
+    def test_unknown_consumer_and_access_token(self):
+        self.assertRaises(InvalidConsumerError, self.store.get_consumer_and_access_token,
+                          None, None, 'unknown', self.token.key)
+        self.assertRaises(InvalidTokenError, self.store.get_consumer_and_access_token,
+                          None, None, 'consumerkey', 'unknown')
+
+    def test_unknown_keys_are_remembered_in_process(self):
+        self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'unknown')
+        self.assertRaises(InvalidTokenError, self.store.get_consumer_and_access_token,
+                          None, None, 'consumerkey', 'unknown')
+        get_oauth_cache().clear()
+        with self.assertNumQueries(0):
+            self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'unknown')
+            self.assertRaises(InvalidConsumerError, self.store.get_consumer_and_access_token,
+                              None, None, 'unknown', self.token.key)
+            self.assertRaises(InvalidTokenError, self.store.get_access_token,
+                              None, None, self.consumer, 'unknown')
+
+    def test_creating_keys_forgets_unknown_keys(self):
+        self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'newkey')
+        consumer = Consumer.objects.create(name='new', key='newkey', secret='secret')
+        token = Token(key='newtoken', secret='secret', token_type=Token.ACCESS, consumer=consumer, timestamp=0)
+        self.assertRaises(InvalidTokenError, self.store.get_access_token, None, None, consumer, token.key)
+        token.save()
+        self.assertEqual(self.store.get_consumer_and_access_token(None, None, 'newkey', 'newtoken'),
+                         (consumer, token))
+
+    def test_consumer_key_filter(self):
+        with mock.patch.object(caching, 'consumer_key_filter', ConsumerKeyFilter(300)):
+            self.assertEqual(self.store.get_consumer(None, None, 'consumerkey'), self.consumer)
+            with self.assertNumQueries(0):
+                self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'garbage')
+            consumer = Consumer.objects.create(name='new', key='newkey', secret='secret')
+            self.assertEqual(self.store.get_consumer(None, None, 'newkey'), consumer)
+
+
+class NegativeCacheTest(TestCase):
+    def test_keys_expire(self):
+        unknown = NegativeCache(size=2, timeout=5)
+        with mock.patch('time.time', return_value=1000.0):
+            unknown.add('a')
+            self.assertTrue('a' in unknown)
+        with mock.patch('time.time', return_value=1006.0):
+            self.assertFalse('a' in unknown)
+
+    def test_size_is_bounded(self):
+        unknown = NegativeCache(size=2, timeout=5)
+        for key in ('a', 'b', 'c'):
+            unknown.add(key)
+        self.assertEqual([key in unknown for key in ('a', 'b', 'c')], [False, True, True])
+
+    def test_zero_timeout_disables(self):
+        unknown = NegativeCache(size=2, timeout=0)
+        unknown.add('a')
+        self.assertFalse('a' in unknown)
+
+
+class BloomFilterTest(TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = ['key%d' % i for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(1 for i in range(10000) if 'other%d' % i in bloom)
+        self.assertTrue(false_positives < 300, false_positives)
+
+
+class CachedModelStoreTest(ModelStoreTest):
+    store_class = CachedModelStore
+
+    def test_consumer_and_access_token_in_one_query(self):
+        self.store.get_consumer_and_access_token(None, None, 'consumerkey', self.token.key)
+        with self.assertNumQueries(0):
+            consumer, token = self.store.get_consumer_and_access_token(None, None, 'consumerkey', self.token.key)
+            token.consumer
+        self.assertEqual(consumer, self.consumer)
+        self.assertEqual(token, self.token)
+
+    def test_consumer_is_cached(self):
+        self.store.get_consumer(None, None, 'consumerkey')
+        with self.assertNumQueries(0):
+            consumer = self.store.get_consumer(None, None, 'consumerkey')
+        self.assertEqual(consumer, self.consumer)
+
+    def test_access_token_is_cached(self):
+        self.store.get_access_token(None, None, self.consumer, self.token.key)
+        with self.assertNumQueries(0):
+            token = self.store.get_access_token(None, None, self.consumer, self.token.key)
+        self.assertEqual(token, self.token)
+
+    def test_unknown_keys_are_cached(self):
+        self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'unknown')
+        self.assertRaises(InvalidTokenError, self.store.get_access_token, None, None, self.consumer, 'unknown')
+        with self.assertNumQueries(0):
+            self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'unknown')
+            self.assertRaises(InvalidTokenError, self.store.get_access_token, None, None, self.consumer, 'unknown')
+
+    def test_creating_consumer_invalidates_unknown_key(self):
+        self.assertRaises(InvalidConsumerError, self.store.get_consumer, None, None, 'newkey')
+        consumer = Consumer.objects.create(name='new', key='newkey', secret='secret')
+        self.assertEqual(self.store.get_consumer(None, None, 'newkey'), consumer)
+
+    def test_saving_consumer_invalidates_cache(self):
+        self.store.get_consumer(None, None, 'consumerkey')
+        self.consumer.secret = 'rotated'
+        self.consumer.save()
+        self.assertEqual(self.store.get_consumer(None, None, 'consumerkey').secret, 'rotated')
+
+    def test_deleting_token_invalidates_cache(self):
+        self.store.get_access_token(None, None, self.consumer, self.token.key)
+        self.token.delete()
+        self.assertRaises(InvalidTokenError, self.store.get_access_token, None, None, self.consumer, self.token.key)
+
+
+class NonceStoreTestMixin(object):
+    def setUp(self):
+        get_oauth_cache().clear()
+        self.oauth_request = {'oauth_consumer_key': 'consumerkey', 'oauth_token': 'tokenkey'}
+        self.timestamp = int(time.time())
+
+    def test_nonce_is_accepted_once(self):
+        self.assertTrue(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp))
+        self.assertFalse(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp))
+
+    def test_nonce_is_scoped_to_credentials(self):
+        self.assertTrue(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp))
+        other_request = {'oauth_consumer_key': 'consumerkey', 'oauth_token': 'othertoken'}
+        self.assertTrue(self.nonce_store.check_nonce(None, other_request, 'nonce', self.timestamp))
+        self.assertTrue(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp + 1))
+
+    def test_expired_timestamp_is_rejected(self):
+        self.assertFalse(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp - 3600))
+
+    def test_future_timestamp_is_rejected(self):
+        self.assertFalse(self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp + 3600))
+
+
+class ModelNonceStoreTest(NonceStoreTestMixin, TestCase):
+    nonce_store = ModelNonceStore()
+
+    def test_check_is_a_single_insert(self):
+        for i in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp)
+            statements = [query['sql'].split(' ', 1)[0].upper() for query in queries]
+            self.assertEqual(statements.count('INSERT'), 1)
+            self.assertFalse('SELECT' in statements)
+        self.assertEqual(Nonce.objects.count(), 1)
+
+    def test_unique_on_fixed_length_digest(self):
+        self.nonce_store.check_nonce(None, self.oauth_request, u'n\xf6nce' * 50, self.timestamp)
+        nonce = Nonce.objects.get()
+        self.assertEqual(nonce.digest, nonce_digest('consumerkey', 'tokenkey', u'n\xf6nce' * 50, self.timestamp))
+        self.assertEqual(len(nonce.digest), Nonce._meta.get_field('digest').max_length)
+        self.assertFalse(Nonce._meta.unique_together)
+
+
+class CacheNonceStoreTest(NonceStoreTestMixin, TestCase):
+    nonce_store = CacheNonceStore()
+
+    def test_no_database_queries(self):
+        with self.assertNumQueries(0):
+            self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp)
+
+    def test_entry_outlives_the_timestamp_window(self):
+        # OAUTH_NONCE_VALID_PERIOD is 120 in the test settings
+        with mock.patch('oauth_provider.store.nonce.current_timestamp', return_value=self.timestamp):
+            with mock.patch('oauth_provider.store.nonce.get_cache') as get_cache:
+                self.nonce_store.check_nonce(None, self.oauth_request, 'nonce', self.timestamp + 100)
+        self.assertEqual(get_cache.return_value.add.call_args[0][2], 221)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.test.client import RequestFactory
+
+from oauth_provider import utils, verification
+from oauth_provider.models import Nonce, Token
+from oauth_provider.tests.auth import BaseOAuthTestCase
+
+
+class VerificationPipelineTest(BaseOAuthTestCase):
+    def setUp(self):
+        super(VerificationPipelineTest, self).setUp()
+        self._request_token()
+        self._authorize_and_access_token_using_form()
+        self.parameters = {
+            'oauth_consumer_key': self.CONSUMER_KEY,
+            'oauth_signature_method': "PLAINTEXT",
+            'oauth_version': "1.0",
+            'oauth_token': self.ACCESS_TOKEN_KEY,
+            'oauth_timestamp': str(int(time.time())),
+            'oauth_nonce': "pipelinenonce",
+            'oauth_signature': "%s&%s" % (self.CONSUMER_SECRET, self.ACCESS_TOKEN_SECRET),
+        }
+
+    def _oauth_request(self, **parameters):
+        self.parameters.update(parameters)
+        request = RequestFactory().get("/oauth/none/", self.parameters)
+        return request, utils.get_oauth_request(request)
+
+    def test_forged_signature_does_not_write_nonce(self):
+        nonces = Nonce.objects.count()
+        response = self.c.get("/oauth/none/", dict(self.parameters, oauth_signature='forged&forged'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(Nonce.objects.count(), nonces)
+
+    def test_precheck_needs_no_query(self):
+        for parameters in ({}, {'oauth_timestamp': str(int(time.time()) - 3600)},
+                           {'oauth_timestamp': str(int(time.time()) + 3600)},
+                           {'oauth_timestamp': 'garbage'}, {'oauth_signature_method': 'RSA-MD5'}):
+            request, oauth_request = self._oauth_request(**parameters)
+            with self.assertNumQueries(0):
+                result = utils.precheck_oauth_request(request, oauth_request)
+            self.assertEqual(result, not parameters)
+
+    def test_rejection_reasons(self):
+        for stage, parameters, reason in (
+                (verification.check_parameters, {'oauth_signature_method': 'RSA-MD5'}, 'signature_method'),
+                (verification.check_timestamp, {'oauth_timestamp': 'garbage'}, 'timestamp'),
+                (verification.check_timestamp, {'oauth_timestamp': str(int(time.time()) + 3600)}, 'timestamp')):
+            request, oauth_request = self._oauth_request(**parameters)
+            try:
+                stage(request, oauth_request)
+            except verification.VerificationError, e:
+                self.assertEqual(e.reason, reason)
+            else:
+                self.fail('%s accepted the request' % stage.__name__)
+
+    def test_verify_oauth_request_runs_all_stages(self):
+        token = Token.objects.get(key=self.ACCESS_TOKEN_KEY)
+        request, oauth_request = self._oauth_request(oauth_timestamp=str(int(time.time()) - 3600))
+        self.assertFalse(utils.verify_oauth_request(request, oauth_request, self.consumer, token))
+        request, oauth_request = self._oauth_request(oauth_timestamp=str(int(time.time())))
+        self.assertTrue(utils.verify_oauth_request(request, oauth_request, self.consumer, token))
+
+    def test_stages_are_configurable(self):
+        calls = []
+        def stage(request, oauth_request, consumer, token):
+            calls.append((consumer, token))
+            raise verification.VerificationError('custom')
+
+        verification._stages['OAUTH_POST_RESOLUTION_STAGES'] = [stage]
+        try:
+            token = Token.objects.get(key=self.ACCESS_TOKEN_KEY)
+            request, oauth_request = self._oauth_request()
+            self.assertFalse(utils.verify_oauth_request(request, oauth_request, self.consumer, token))
+        finally:
+            del verification._stages['OAUTH_POST_RESOLUTION_STAGES']
+        self.assertEqual(calls, [(self.consumer, token)])
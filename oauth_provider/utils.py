@@ -5,7 +5,7 @@ from django.conf import settings
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.contrib.auth import authenticate
 
-from consts import MAX_URL_LENGTH
+from consts import MAX_URL_LENGTH, REQUIRED_PARAMETERS
 
 OAUTH_REALM_KEY_NAME = getattr(settings, 'OAUTH_REALM_KEY_NAME', '')
 OAUTH_SIGNATURE_METHODS = getattr(settings, 'OAUTH_SIGNATURE_METHODS', ['plaintext', 'hmac-sha1'])
@@ -16,11 +16,8 @@ def initialize_server_request(request):
     oauth_request = get_oauth_request(request)
 
     if oauth_request:
-        oauth_server = oauth.Server()
-        if 'plaintext' in OAUTH_SIGNATURE_METHODS:
-            oauth_server.add_signature_method(oauth.SignatureMethod_PLAINTEXT())
-        if 'hmac-sha1' in OAUTH_SIGNATURE_METHODS:
-            oauth_server.add_signature_method(oauth.SignatureMethod_HMAC_SHA1())
+        from signatures import engine
+        oauth_server = engine.as_server()
     else:
         oauth_server = None
     return oauth_server, oauth_request
@@ -35,24 +32,66 @@ def send_oauth_error(err=None):
         response[k] = v
     return response
 
+class OAuthState(object):
+    """
+    OAuth state of a Django request, available as `request.oauth` once
+    `get_oauth_request` has been called. `consumer` is set once the store
+    resolved it. `verified` becomes `True` when the request has been verified
+    as a protected resource request, with `token` set to the access Token.
+    After a failed verification `error_response` holds the response to reject
+    the request with.
+    """
+    __slots__ = ('oauth_request', 'consumer', 'token', 'verified', 'error_response')
+
+    def __init__(self, oauth_request):
+        self.oauth_request = oauth_request
+        self.consumer = None
+        self.token = None
+        self.verified = False
+        self.error_response = None
+
+    def set_verified(self, consumer, token):
+        self.consumer = consumer
+        self.token = token
+        self.verified = True
+
 def get_oauth_request(request):
-    """ Converts a Django request object into an `oauth2.Request` object. """
+    """
+    Converts a Django request object into an `OAuthRequest`, the lean
+    equivalent of `oauth2.Request`. The result is parsed once per request and
+    kept in `request.oauth`.
+    """
+    state = getattr(request, 'oauth', None)
+    # not isinstance(), which would evaluate the lazy state set by
+    # OAuthAuthenticationMiddleware
+    if type(state) is OAuthState:
+        return state.oauth_request
+
+    from signals import timed
+
+    with timed(request, 'parse') as timer:
+        oauth_request = _parse_oauth_request(request)
+        # before the timer signals, whose receivers may read request.oauth
+        request.oauth = OAuthState(oauth_request)
+        if oauth_request is None:
+            timer.fail('missing')
+    return oauth_request
+
+def _parse_oauth_request(request):
+    from parsing import parse_request
+
     # Django converts Authorization header in HTTP_AUTHORIZATION
     # Warning: it doesn't happen in tests but it's useful, do not remove!
-    auth_header = {}
-    if 'Authorization' in request.META:
-        auth_header = {'Authorization': request.META['Authorization']}
-    elif 'HTTP_AUTHORIZATION' in request.META:
-        auth_header =  {'Authorization': request.META['HTTP_AUTHORIZATION']}
+    auth_header = request.META.get('Authorization') or request.META.get('HTTP_AUTHORIZATION')
 
 
     # include POST parameters if content type is
     # 'application/x-www-form-urlencoded' and request
     # see: http://tools.ietf.org/html/rfc5849#section-3.4.1.3.1
-    parameters = {}
+    parameters = None
 
     if request.method == "POST" and request.META.get('CONTENT_TYPE') == "application/x-www-form-urlencoded":
-        parameters = dict((k, v.encode('utf-8')) for (k, v) in request.POST.iteritems())
+        parameters = request.POST.iteritems()
 
     absolute_uri = request.build_absolute_uri(request.path)
 
@@ -62,36 +101,42 @@ def get_oauth_request(request):
         scheme = schemes[0]
         absolute_uri = urlunparse((scheme, ) + urlparse(absolute_uri)[1:])
 
-    return oauth.Request.from_request(request.method,
+    return parse_request(request.method,
         absolute_uri,
-        headers=auth_header,
-        parameters=parameters,
+        authorization=auth_header,
+        form=parameters,
         query_string=request.META.get('QUERY_STRING', '')
     )
 
-def verify_oauth_request(request, oauth_request, consumer, token=None):
-    """ Helper function to verify requests. """
-    from store import store
+def precheck_oauth_request(request, oauth_request):
+    """
+    Helper function running the verification stages which need neither the
+    store nor the credentials. Call it before resolving the consumer.
+    """
+    from verification import run_stages, VerificationError
 
-    # Check nonce
-    if not store.check_nonce(request, oauth_request, oauth_request['oauth_nonce'], oauth_request['oauth_timestamp']):
+    try:
+        run_stages('OAUTH_PRE_RESOLUTION_STAGES', request, oauth_request)
+    except VerificationError:
         return False
+    return True
 
-    # Verify request
-    try:
-        oauth_server = oauth.Server()
-        oauth_server.add_signature_method(oauth.SignatureMethod_HMAC_SHA1())
-        oauth_server.add_signature_method(oauth.SignatureMethod_PLAINTEXT())
+def verify_oauth_request(request, oauth_request, consumer, token=None):
+    """ Helper function to verify requests. """
+    return precheck_oauth_request(request, oauth_request) and \
+        verify_resolved_request(request, oauth_request, consumer, token)
 
-        # Ensure the passed keys and secrets are ascii, or HMAC will complain.
-        consumer = oauth.Consumer(consumer.key.encode('ascii', 'ignore'), consumer.secret.encode('ascii', 'ignore'))
-        if token is not None:
-            token = oauth.Token(token.key.encode('ascii', 'ignore'), token.secret.encode('ascii', 'ignore'))
+def verify_resolved_request(request, oauth_request, consumer, token=None):
+    """
+    Helper function running the verification stages which need the consumer
+    and token, for requests that passed `precheck_oauth_request`.
+    """
+    from verification import run_stages, VerificationError
 
-        oauth_server.verify_request(oauth_request, consumer, token)
-    except oauth.Error, err:
+    try:
+        run_stages('OAUTH_POST_RESOLUTION_STAGES', request, oauth_request, consumer, token)
+    except VerificationError:
         return False
-
     return True
 
 def is_xauth_request(request):
@@ -115,13 +160,7 @@ def verify_xauth_request(request, oauth_request):
 
 def require_params(oauth_request, parameters=None):
     """ Ensures that the request contains all required parameters. """
-    params = [
-        'oauth_consumer_key',
-        'oauth_nonce',
-        'oauth_signature',
-        'oauth_signature_method',
-        'oauth_timestamp'
-    ]
+    params = list(REQUIRED_PARAMETERS)
     if parameters:
         params.extend(parameters)
 
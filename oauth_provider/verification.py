@@ -0,0 +1,107 @@
+"""
+Verification of signed requests as an ordered pipeline of stages.
+
+Stages run from the cheapest to the most expensive check so invalid traffic
+is rejected before it costs a database round trip:
+
+1. `OAUTH_PRE_RESOLUTION_STAGES` only look at the request itself (required
+   parameters, signature method, timestamp window);
+2. the view resolves the Consumer and Token through the store;
+3. `OAUTH_POST_RESOLUTION_STAGES` need those credentials (signature, then
+   nonce, the only check writing anything).
+
+A stage is a callable taking `(request, oauth_request, consumer, token)` and
+raising `VerificationError` to reject the request. Both settings are lists of
+dotted paths, so stages can be replaced, reordered or added. Each stage is
+timed under its function name through `signals.stage_timed`.
+"""
+import time
+
+import oauth2 as oauth
+
+from django.conf import settings
+from django.utils.translation import ugettext as _
+
+from oauth_provider.compat import importlib
+from oauth_provider.consts import REQUIRED_PARAMETERS
+from oauth_provider.signals import timed
+from oauth_provider.signatures import engine, credentials
+
+NONCE_VALID_PERIOD = getattr(settings, 'OAUTH_NONCE_VALID_PERIOD', None)
+TIMESTAMP_THRESHOLD = getattr(settings, 'OAUTH_TIMESTAMP_THRESHOLD', oauth.Server.timestamp_threshold)
+
+DEFAULT_STAGES = {
+    'OAUTH_PRE_RESOLUTION_STAGES': (
+        'oauth_provider.verification.check_parameters',
+        'oauth_provider.verification.check_timestamp',
+    ),
+    'OAUTH_POST_RESOLUTION_STAGES': (
+        'oauth_provider.verification.check_signature',
+        'oauth_provider.verification.check_nonce',
+    ),
+}
+
+
+class VerificationError(oauth.Error):
+    """Rejection of a request by a stage; `reason` names the failed check."""
+    def __init__(self, reason, message=None):
+        super(VerificationError, self).__init__(message or _('Could not verify OAuth request.'))
+        self.reason = reason
+
+
+def check_parameters(request, oauth_request, consumer=None, token=None):
+    """Require the OAuth parameters and a supported signature method."""
+    for parameter in REQUIRED_PARAMETERS:
+        if parameter not in oauth_request:
+            raise VerificationError('parameters', _('Missing OAuth parameter: %s') % parameter)
+    if oauth_request['oauth_signature_method'] not in engine.methods:
+        raise VerificationError('signature_method')
+
+
+def check_timestamp(request, oauth_request, consumer=None, token=None):
+    """
+    Reject malformed timestamps and those outside the accepted window, in the
+    past or in the future.
+    """
+    try:
+        timestamp = int(oauth_request['oauth_timestamp'])
+    except (KeyError, ValueError):
+        raise VerificationError('timestamp')
+    # future timestamps are bounded as well, as nonce stores only remember
+    # nonces for the window
+    lapsed = abs(int(time.time()) - timestamp)
+    if lapsed > TIMESTAMP_THRESHOLD or (NONCE_VALID_PERIOD and lapsed > NONCE_VALID_PERIOD):
+        raise VerificationError('timestamp')
+
+
+def check_signature(request, oauth_request, consumer, token=None):
+    try:
+        engine.verify(oauth_request, credentials(consumer), credentials(token))
+    except oauth.Error:
+        raise VerificationError('signature')
+
+
+def check_nonce(request, oauth_request, consumer, token=None):
+    from oauth_provider.store import store
+
+    if not store.check_nonce(request, oauth_request, oauth_request['oauth_nonce'], oauth_request['oauth_timestamp']):
+        raise VerificationError('nonce')
+
+
+_stages = {}
+
+def get_stages(setting):
+    """Return the stage callables configured by `setting`, loaded once."""
+    if setting not in _stages:
+        stages = []
+        for path in getattr(settings, setting, DEFAULT_STAGES[setting]):
+            module, attr = path.rsplit('.', 1)
+            stages.append(getattr(importlib.import_module(module), attr))
+        _stages[setting] = stages
+    return _stages[setting]
+
+
+def run_stages(setting, request, oauth_request, consumer=None, token=None):
+    for stage in get_stages(setting):
+        with timed(request, stage.__name__):
+            stage(request, oauth_request, consumer, token)
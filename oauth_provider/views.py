@@ -15,9 +15,11 @@ from forms import AuthorizeRequestTokenForm
 from oauth_provider.compat import UnsafeRedirect
 from responses import INVALID_PARAMS_RESPONSE, INVALID_CONSUMER_RESPONSE, COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
 from store import store, InvalidConsumerError, InvalidTokenError
-from utils import verify_oauth_request, get_oauth_request, require_params, send_oauth_error
+from utils import verify_resolved_request, precheck_oauth_request, get_oauth_request, require_params, send_oauth_error
 from utils import is_xauth_request
 from consts import OUT_OF_BAND
+from signals import timed
+from ratelimit import check_rate_limits
 
 OAUTH_AUTHORIZE_VIEW = 'OAUTH_AUTHORIZE_VIEW'
 OAUTH_CALLBACK_VIEW = 'OAUTH_CALLBACK_VIEW'
@@ -30,6 +32,10 @@ def request_token(request):
     if oauth_request is None:
         return INVALID_PARAMS_RESPONSE
 
+    rate_limited = check_rate_limits(request, oauth_request)
+    if rate_limited is not None:
+        return rate_limited
+
     missing_params = require_params(oauth_request, ('oauth_callback',))
     if missing_params is not None:
         return missing_params
@@ -37,12 +43,18 @@ def request_token(request):
     if is_xauth_request(oauth_request):
         return HttpResponseBadRequest('xAuth not allowed for this method.')
 
-    try:
-        consumer = store.get_consumer(request, oauth_request, oauth_request['oauth_consumer_key'])
-    except InvalidConsumerError:
-        return INVALID_CONSUMER_RESPONSE
+    if not precheck_oauth_request(request, oauth_request):
+        return COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
 
-    if not verify_oauth_request(request, oauth_request, consumer):
+    with timed(request, 'resolve') as timer:
+        try:
+            consumer = store.get_consumer(request, oauth_request, oauth_request['oauth_consumer_key'])
+        except InvalidConsumerError:
+            timer.fail('invalid_consumer')
+            return INVALID_CONSUMER_RESPONSE
+    request.oauth.consumer = consumer
+
+    if not verify_resolved_request(request, oauth_request, consumer):
         return COULD_NOT_VERIFY_OAUTH_REQUEST_RESPONSE
 
     try:
@@ -136,11 +148,26 @@ def access_token(request):
     if oauth_request is None:
         return INVALID_PARAMS_RESPONSE
 
+    rate_limited = check_rate_limits(request, oauth_request)
+    if rate_limited is not None:
+        return rate_limited
+
+    missing_params = require_params(oauth_request)
+    if missing_params is not None:
+        return missing_params
+
+    # Cheap checks first, before any store access
+    if not precheck_oauth_request(request, oauth_request):
+        return HttpResponseBadRequest('Could not verify OAuth request.')
+
     # Consumer
-    try:
-        consumer = store.get_consumer(request, oauth_request, oauth_request['oauth_consumer_key'])
-    except InvalidConsumerError:
-        return HttpResponseBadRequest('Invalid consumer.')
+    with timed(request, 'resolve') as timer:
+        try:
+            consumer = store.get_consumer(request, oauth_request, oauth_request['oauth_consumer_key'])
+        except InvalidConsumerError:
+            timer.fail('invalid_consumer')
+            return HttpResponseBadRequest('Invalid consumer.')
+    request.oauth.consumer = consumer
 
     is_xauth = is_xauth_request(oauth_request)
 
@@ -160,7 +187,7 @@ def access_token(request):
             return HttpResponseBadRequest('Request Token not approved by the user.')
 
         # Verify Signature
-        if not verify_oauth_request(request, oauth_request, consumer, request_token):
+        if not verify_resolved_request(request, oauth_request, consumer, request_token):
             return HttpResponseBadRequest('Could not verify OAuth request.')
        
         # Check Verifier
@@ -179,7 +206,7 @@ def access_token(request):
             return HttpResponseBadRequest('xAuth not allowed for this method')
 
         # Check Signature
-        if not verify_oauth_request(request, oauth_request, consumer):
+        if not verify_resolved_request(request, oauth_request, consumer):
             return HttpResponseBadRequest('Could not verify xAuth request.')
 
         user = authenticate(